@@ -0,0 +1,80 @@
+import bisect
+
+class AlertIndex:
+    """In-memory alerts keyed by skin; targets are kept sorted so one bisect finds every triggered alert"""
+    def __init__(self):
+        self._targets = {}
+        self._users = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds the index from get_all_alerts() rows"""
+        index = cls()
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row['skin_name'], []).append((row['target_price'], row['user_id']))
+
+        for skin_name, entries in grouped.items():
+            entries.sort()
+            index._targets[skin_name] = [target for target, _ in entries]
+            index._users[skin_name] = [user_id for _, user_id in entries]
+        return index
+
+    def __len__(self):
+        return sum(len(targets) for targets in self._targets.values())
+
+    def __contains__(self, skin_name):
+        return skin_name in self._targets
+
+    def skins(self):
+        return list(self._targets)
+
+    def nearest_target(self, skin_name: str):
+        """Highest target of the skin, i.e. the first one a falling price will hit"""
+        targets = self._targets.get(skin_name)
+        return targets[-1] if targets else None
+
+    def watchers(self, skin_name: str) -> int:
+        return len(self._targets.get(skin_name, ()))
+
+    def add(self, user_id: int, skin_name: str, target_price: float):
+        self.remove(user_id, skin_name)
+        targets = self._targets.setdefault(skin_name, [])
+        users = self._users.setdefault(skin_name, [])
+        i = bisect.bisect_right(targets, target_price)
+        targets.insert(i, target_price)
+        users.insert(i, user_id)
+
+    def remove(self, user_id: int, skin_name: str):
+        users = self._users.get(skin_name)
+        if not users or user_id not in users:
+            return
+        i = users.index(user_id)
+        del users[i]
+        del self._targets[skin_name][i]
+        if not users:
+            del self._users[skin_name]
+            del self._targets[skin_name]
+
+    def triggered(self, skin_name: str, price: float):
+        """Returns [(user_id, target_price)] for every alert with target >= price"""
+        targets = self._targets.get(skin_name)
+        if not targets:
+            return []
+        i = bisect.bisect_left(targets, price)
+        return list(zip(self._users[skin_name][i:], targets[i:]))
+
+    def pop_triggered(self, skin_name: str, price: float):
+        """Same as triggered(), but also drops the returned alerts from the index"""
+        targets = self._targets.get(skin_name)
+        if not targets:
+            return []
+        i = bisect.bisect_left(targets, price)
+        fired = list(zip(self._users[skin_name][i:], targets[i:]))
+        if fired:
+            del targets[i:]
+            del self._users[skin_name][i:]
+            if not targets:
+                del self._targets[skin_name]
+                del self._users[skin_name]
+        return fired
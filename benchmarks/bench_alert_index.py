@@ -0,0 +1,61 @@
+"""Alert matching for one monitor cycle: the old list scan vs AlertIndex.
+
+    python -m benchmarks.bench_alert_index [alerts] [skins]
+
+The list scan is O(skins x alerts), so it is timed on a sample of skins and
+extrapolated to the full cycle.
+"""
+import random
+import sys
+import time
+
+from alerts import AlertIndex
+
+
+def make_alerts(alerts: int, skins: int):
+    rng = random.Random(42)
+    names = [f"Skin #{i} (Field-Tested)" for i in range(skins)]
+    return [
+        {"user_id": user_id, "skin_name": rng.choice(names), "target_price": round(rng.uniform(1, 100), 2)}
+        for user_id in range(alerts)
+    ], names
+
+
+def scan(alerts, skin_name, price):
+    fired = []
+    for alert in alerts:
+        if alert['skin_name'] == skin_name and price <= alert['target_price']:
+            fired.append((alert['user_id'], alert['target_price']))
+    return fired
+
+
+def main(alert_count: int, skin_count: int):
+    alerts, names = make_alerts(alert_count, skin_count)
+    rng = random.Random(7)
+    prices = {name: round(rng.uniform(1, 100), 2) for name in names}
+
+    sample = names[:min(200, skin_count)]
+    started = time.perf_counter()
+    scanned = sum(len(scan(alerts, name, prices[name])) for name in sample)
+    scan_total = (time.perf_counter() - started) / len(sample) * skin_count
+
+    started = time.perf_counter()
+    index = AlertIndex.from_rows(alerts)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matched = sum(len(index.triggered(name, prices[name])) for name in names)
+    lookup = time.perf_counter() - started
+
+    assert scanned == sum(len(index.triggered(name, prices[name])) for name in sample)
+
+    print(f"{alert_count} alerts over {skin_count} skins, {matched} triggered this cycle")
+    print(f"list scan (extrapolated): {scan_total * 1000:10.1f} ms per cycle")
+    print(f"AlertIndex build:         {build * 1000:10.1f} ms")
+    print(f"AlertIndex lookups:       {lookup * 1000:10.1f} ms per cycle")
+    print(f"speedup (lookups):        {scan_total / lookup:10.0f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [100_000, 5_000][len(args):]))
@@ -0,0 +1,54 @@
+"""Items priced per Steam request: one priceoverview call per skin vs the bulk search backend.
+
+    python -m benchmarks.bench_bulk_pricing [skins]
+
+Uses the local stub server (synthetic catalog, or recorded pages via
+STUB_STEAM_RECORDINGS). The rate limiter is opened up so only request counts matter.
+"""
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.stub_steam import CATALOG, start_stub
+from steam_client import SteamClient, RateLimiter
+
+
+async def main(skins: int):
+    runner, base = await start_stub()
+    app = runner.app
+    client = SteamClient(
+        base_url=f"{base}/market/priceoverview/",
+        search_url=f"{base}/market/search/render/",
+        limiter=RateLimiter(requests_per_minute=10 ** 7, burst=10 ** 6)
+    )
+    wanted = random.Random(1).sample(CATALOG, min(skins, len(CATALOG)))
+
+    started = time.perf_counter()
+    single = {}
+    for name in wanted:
+        _, price = await client.get_price(name)
+        if price is not None:
+            single[name] = price
+    single_time = time.perf_counter() - started
+    single_requests = app["priceoverview_requests"]
+
+    started = time.perf_counter()
+    bulk = await client.get_prices_bulk(wanted, allow_sweep=True)
+    bulk_time = time.perf_counter() - started
+    bulk_requests = app["search_requests"]
+    covered = sum(1 for name in wanted if name in bulk)
+
+    await client.close()
+    await runner.cleanup()
+
+    print(f"{len(wanted)} skins requested (catalog of {len(CATALOG)})")
+    print(f"priceoverview: {len(single):5d} priced in {single_requests:5d} requests "
+          f"({len(single) / max(single_requests, 1):6.2f} items/request, {single_time:.2f}s)")
+    print(f"bulk search:   {covered:5d} priced in {bulk_requests:5d} requests "
+          f"({covered / max(bulk_requests, 1):6.2f} items/request, {bulk_time:.2f}s), "
+          f"{len(bulk) - covered} extra prices seen")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,55 @@
+"""Per-request latency: a fresh ClientSession per call vs the shared SteamClient session.
+
+    python -m benchmarks.bench_http_session [requests]
+
+The stub is plain HTTP on loopback, so against steamcommunity.com (TLS + real RTT)
+the cost of a fresh handshake per command is much larger than shown here.
+"""
+import asyncio
+import statistics
+import sys
+import time
+import aiohttp
+
+from benchmarks.stub_steam import start_stub
+from steam_client import SteamClient
+
+
+def summary(label: str, samples: list):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+    print(f"{label:<28} p50={p50:7.3f} ms  p99={p99:7.3f} ms  mean={statistics.mean(samples) * 1000:7.3f} ms")
+
+
+async def main(requests: int):
+    runner, base = await start_stub()
+    url = f"{base}/market/priceoverview/?appid=730&currency=1&market_hash_name=AK-47%20%7C%20Redline"
+
+    fresh = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                await response.json()
+        fresh.append(time.perf_counter() - started)
+
+    client = SteamClient(base_url=f"{base}/market/priceoverview/")
+    await client.start()
+    shared = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        async with client.session.get(url) as response:
+            await response.json()
+        shared.append(time.perf_counter() - started)
+    await client.close()
+    await runner.cleanup()
+
+    print(f"{requests} sequential requests against {base}")
+    summary("new session per request", fresh)
+    summary("shared SteamClient session", shared)
+    print(f"speedup (mean): {statistics.mean(fresh) / statistics.mean(shared):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
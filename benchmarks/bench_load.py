@@ -0,0 +1,293 @@
+"""End-to-end load test: synthetic users drive the dispatcher while the monitor runs.
+
+    python -m benchmarks.bench_load [--users 200] [--alerts-per-user 5] [--ops 2000]
+        [--concurrency 50] [--steam-latency 0.05] [--steam-429 0.01] [--output load.json]
+
+Steam and the Telegram Bot API are local stubs (benchmarks.stub_steam,
+benchmarks.fake_telegram); Postgres is the one configured with DB_*. Use a
+throwaway database: the monitor watches every alert in it, and the synthetic
+users (ids from BENCH_USER_BASE) are removed afterwards but their prices stay.
+
+Phases:
+  1. setup  - every user sets `--alerts-per-user` alerts; `--trigger-share` of them
+              are above the current price and fire on the first check
+  2. mixed  - `--ops` random /prices, /add, /alert and /check commands
+  3. drain  - wait until every firing alert reached the fake Telegram API
+
+The result is a single JSON document (stdout, or --output): throughput and
+p50/p99 handler latency per command, monitor sweep time, end-to-end alert lag
+(/alert answered -> alert message received) and Steam/Telegram request counts.
+Bot and monitor logs go to stderr.
+"""
+import os
+
+# Measure the code, not the production throttles; explicit env settings still win
+os.environ.setdefault("BOT_TOKEN", "100000001:bench")
+os.environ.setdefault("STEAM_429_PAUSE", "1")
+os.environ.setdefault("NOTIFY_GLOBAL_RATE", "1000")
+os.environ.setdefault("NOTIFY_CHAT_INTERVAL", "0")
+os.environ.setdefault("MONITOR_BATCH_SIZE", "100")
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import random
+import sys
+import time
+
+from aiogram.types import Update
+
+import metrics
+from benchmarks.fake_telegram import fake_bot, message_update, start_fake_telegram
+from benchmarks.stub_steam import CATALOG, fake_price, start_stub
+from bot import dp
+from catalog import catalog
+from database import db
+from inventory import InventoryStore
+from monitor import start_monitoring
+from notifier import escape_markdown
+from price_cache import PriceCache
+from steam_client import SteamClient, RateLimiter
+
+BENCH_USER_BASE = 9_000_000_000
+MIX = [("/prices", 0.5), ("/add", 0.25), ("/alert", 0.2), ("/check", 0.05)]
+PROFILES = [f"https://steamcommunity.com/profiles/765611980000000{i:02d}" for i in range(5)]
+
+
+def percentile(samples, q: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def summary(samples) -> dict:
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 0.5),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples) if samples else None
+    }
+
+
+class LoadRun:
+    def __init__(self, args, bot, telegram_app, steam, prices):
+        self.args = args
+        self.bot = bot
+        self.telegram_app = telegram_app
+        self.deps = {"steam": steam, "prices": prices, "inventories": InventoryStore(steam)}
+        self.rng = random.Random(args.seed)
+        self.update_id = 0
+        self.latency = {}
+        self.errors = 0
+        # user_id -> {skin_name: perf_counter when the firing /alert was answered}
+        self.firing = {}
+
+    async def send(self, user_id: int, text: str):
+        self.update_id += 1
+        update = Update.model_validate(message_update(self.update_id, user_id, text), context={"bot": self.bot})
+        command = text.split()[0]
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(self.bot, update, **self.deps)
+        except Exception as e:
+            self.errors += 1
+            print(f"{command} failed: {e}", file=sys.stderr)
+        finished = time.perf_counter()
+        self.latency.setdefault(command, []).append(finished - started)
+        return finished
+
+    def alert_command(self, user_id: int, firing: bool):
+        skin_name = self.rng.choice(CATALOG)
+        price = fake_price(skin_name)
+        target = round(price * 1.2, 2) if firing else round(price * 0.5, 2)
+        return skin_name, f"/alert {skin_name} {target}"
+
+    async def set_alert(self, user_id: int, firing: bool):
+        skin_name, text = self.alert_command(user_id, firing)
+        answered = await self.send(user_id, text)
+        if firing:
+            self.firing.setdefault(user_id, {}).setdefault(skin_name, answered)
+        else:
+            # The new target replaced a firing one
+            self.firing.get(user_id, {}).pop(skin_name, None)
+
+    async def run_pool(self, jobs):
+        """Runs coroutine factories with at most --concurrency in flight; returns wall time"""
+        jobs = iter(jobs)
+
+        async def worker():
+            for job in jobs:
+                await job()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        return time.perf_counter() - started
+
+    def setup_jobs(self):
+        for i in range(self.args.users):
+            user_id = BENCH_USER_BASE + i
+            for _ in range(self.args.alerts_per_user):
+                firing = self.rng.random() < self.args.trigger_share
+                yield lambda user_id=user_id, firing=firing: self.set_alert(user_id, firing)
+
+    def mixed_jobs(self):
+        commands, weights = zip(*MIX)
+        for _ in range(self.args.ops):
+            user_id = BENCH_USER_BASE + self.rng.randrange(self.args.users)
+            command = self.rng.choices(commands, weights)[0]
+            if command == "/alert":
+                firing = self.rng.random() < self.args.trigger_share
+                yield lambda user_id=user_id, firing=firing: self.set_alert(user_id, firing)
+            elif command == "/add":
+                text = f"/add {self.rng.choice(CATALOG)} {self.rng.uniform(1, 100):.2f}"
+                yield lambda user_id=user_id, text=text: self.send(user_id, text)
+            elif command == "/check":
+                text = f"/check {self.rng.choice(PROFILES)}"
+                yield lambda user_id=user_id, text=text: self.send(user_id, text)
+            else:
+                yield lambda user_id=user_id: self.send(user_id, "/prices")
+
+    def alert_lags(self):
+        """Matches alert messages received by the fake API to the firing alerts"""
+        lags = []
+        delivered = set()
+        for received_at, chat_id, text in self.telegram_app["messages"]:
+            if not text or not text.startswith("🚨"):
+                continue
+            for skin_name, answered_at in self.firing.get(chat_id, {}).items():
+                key = (chat_id, skin_name)
+                if key not in delivered and f"🔹 {escape_markdown(skin_name)}\n" in text:
+                    delivered.add(key)
+                    # NOTIFY can deliver the alert before the /alert handler has returned
+                    lags.append(max(received_at - answered_at, 0.0))
+        return lags, len(delivered)
+
+    def expected_alerts(self):
+        return sum(len(skins) for skins in self.firing.values())
+
+    async def drain(self):
+        deadline = time.perf_counter() + self.args.drain_timeout
+        while time.perf_counter() < deadline:
+            _, delivered = self.alert_lags()
+            if delivered >= self.expected_alerts():
+                break
+            await asyncio.sleep(0.2)
+
+
+async def wait_for_sweep(watched: int, started: float, timeout: float):
+    """Seconds until the monitor has priced as many skins as are watched (first full sweep)"""
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        skins = sum(series[1] for series in metrics.monitor_cycle_skins.series.values())
+        if skins >= watched:
+            return time.perf_counter() - started
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def main(args):
+    steam_runner, steam_base = await start_stub(latency=args.steam_latency, rate_429=args.steam_429)
+    telegram_runner, telegram_base = await start_fake_telegram(latency=args.telegram_latency)
+    bot = fake_bot(telegram_base)
+
+    await db.connect()
+    await db.create_tables()
+    await catalog.load()
+    async with db.pool.acquire() as connection:
+        await connection.execute("DELETE FROM tracked_items WHERE user_id >= $1", BENCH_USER_BASE)
+
+    steam = SteamClient(
+        base_url=f"{steam_base}/market/priceoverview/",
+        inventory_url=steam_base + "/inventory/{}/730/2",
+        search_url=f"{steam_base}/market/search/render/",
+        limiter=RateLimiter(requests_per_minute=args.steam_rpm, burst=max(args.steam_rpm // 60, 1))
+    )
+    await steam.start()
+    prices = PriceCache(steam)
+    run = LoadRun(args, bot, telegram_runner.app, steam, prices)
+    monitor_task = asyncio.create_task(start_monitoring(bot, prices))
+
+    try:
+        started = time.perf_counter()
+        setup_time = await run.run_pool(run.setup_jobs())
+        setup_updates = sum(len(samples) for samples in run.latency.values())
+        async with db.pool.acquire() as connection:
+            watched = await connection.fetchval(
+                "SELECT COUNT(DISTINCT skin_name) FROM tracked_items WHERE target_price IS NOT NULL"
+            )
+        sweep = asyncio.create_task(wait_for_sweep(watched, started, args.drain_timeout + setup_time))
+
+        mixed_time = await run.run_pool(run.mixed_jobs())
+        await run.drain()
+        sweep_time = await sweep
+        lags, delivered = run.alert_lags()
+    finally:
+        monitor_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await monitor_task
+        async with db.pool.acquire() as connection:
+            await connection.execute("DELETE FROM tracked_items WHERE user_id >= $1", BENCH_USER_BASE)
+        await steam.close()
+        await db.close()
+        await bot.session.close()
+        await telegram_runner.cleanup()
+        await steam_runner.cleanup()
+
+    cycles = metrics.monitor_cycle_seconds.series.get(("embedded",), [None, 0.0, 0])
+    cycle_skins = metrics.monitor_cycle_skins.series.get(("embedded",), [None, 0, 0])
+    return {
+        "config": vars(args),
+        "throughput": {
+            "setup_updates_per_second": setup_updates / setup_time if setup_time else None,
+            "mixed_updates_per_second": args.ops / mixed_time if mixed_time else None,
+            "setup_seconds": setup_time,
+            "mixed_seconds": mixed_time,
+            "errors": run.errors
+        },
+        "handler_latency": {command: summary(samples) for command, samples in sorted(run.latency.items())},
+        "monitor": {
+            "watched_skins": watched,
+            "first_sweep_seconds": sweep_time,
+            "cycles": cycles[2],
+            "mean_cycle_seconds": cycles[1] / cycles[2] if cycles[2] else None,
+            "skins_priced": cycle_skins[1]
+        },
+        "alert_lag": {**summary(lags), "expected": run.expected_alerts(), "delivered": delivered},
+        "steam_requests": {
+            f"{endpoint}:{status}": count
+            for (endpoint, status), count in sorted(metrics.steam_requests.values.items())
+        },
+        "telegram_calls": telegram_runner.app["calls"]
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--alerts-per-user", type=int, default=5)
+    parser.add_argument("--trigger-share", type=float, default=0.2, help="share of alerts that fire")
+    parser.add_argument("--ops", type=int, default=2000, help="commands in the mixed phase")
+    parser.add_argument("--concurrency", type=int, default=50, help="commands in flight")
+    parser.add_argument("--steam-latency", type=float, default=0.05)
+    parser.add_argument("--steam-429", type=float, default=0.01, help="share of Steam requests answered with 429")
+    parser.add_argument("--steam-rpm", type=int, default=6000, help="SteamClient request budget per minute")
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(main(args))
+    document = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
@@ -0,0 +1,102 @@
+"""priceoverview parsing: the old json + replace() chain vs price_parser.
+
+    python -m benchmarks.bench_price_parser [responses]
+
+Parses a corpus of raw response bodies. Set PRICEOVERVIEW_RECORDINGS to a directory
+of recorded /market/priceoverview/ responses (*.json); otherwise a synthetic corpus
+in the formats of the common Steam currencies is generated. Reports throughput and
+how many lowest prices each parser got right (synthetic corpus only).
+"""
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from price_parser import json_loads, parse_price_overview
+
+def _grouped(value: float, thousands: str, decimal: str, cents: bool = True) -> str:
+    """1234.5 -> "1<thousands>234<decimal>50" """
+    text = f"{value:,.2f}" if cents else f"{int(value):,}"
+    return text.replace(",", "\0").replace(".", decimal).replace("\0", thousands)
+
+
+# Steam's formatting per currency: (format function, has cents)
+FORMATS = [
+    (lambda v: "$" + _grouped(v, ",", "."), True),
+    (lambda v: _grouped(v, ".", ",") + "€", True),
+    (lambda v: _grouped(v, ".", ",", cents=False) + ",--€", False),
+    (lambda v: _grouped(v, " ", ",") + " pуб.", True),
+    (lambda v: _grouped(v, "\u00a0", ",") + "₴", True),
+    (lambda v: "R$ " + _grouped(v, ".", ","), True),
+    (lambda v: "£" + _grouped(v, ",", "."), True),
+    (lambda v: "CHF " + _grouped(v, "'", "."), True),
+    (lambda v: "¥ " + _grouped(v, ",", ".", cents=False), False),
+    (lambda v: "₩ " + _grouped(v, ",", ".", cents=False), False),
+]
+
+
+def synthetic_corpus(size: int):
+    rng = random.Random(18)
+    corpus = []
+    for _ in range(size):
+        fmt, cents = rng.choice(FORMATS)
+        value = round(rng.choice([rng.uniform(1, 9.99), rng.uniform(10, 999), rng.uniform(1000, 99999)]), 2)
+        expected = value if cents else float(int(value))
+        body = json.dumps({
+            "success": True,
+            "lowest_price": fmt(value),
+            "volume": f"{rng.randint(0, 20000):,}",
+            "median_price": fmt(value * 1.05)
+        }, ensure_ascii=False).encode()
+        corpus.append((body, expected))
+    return corpus
+
+
+def recorded_corpus(directory: str):
+    return [(path.read_bytes(), None) for path in sorted(Path(directory).glob("*.json"))]
+
+
+def legacy_parse(body: bytes):
+    """The pre-price_parser get_price() logic"""
+    data = json.loads(body)
+    if data and data.get("success") is True:
+        raw_price = data.get("lowest_price")
+        if raw_price:
+            clean_price = raw_price.replace("$", "").replace(",", "").replace("USD", "").strip()
+            try:
+                return float(clean_price)
+            except ValueError:
+                try:
+                    return float(clean_price.replace(",", ""))
+                except ValueError:
+                    return None
+    return None
+
+
+def new_parse(body: bytes):
+    overview = parse_price_overview(body)
+    return overview.lowest if overview else None
+
+
+def run(name: str, parse, corpus):
+    started = time.perf_counter()
+    results = [parse(body) for body, _ in corpus]
+    elapsed = time.perf_counter() - started
+    checked = [(result, expected) for result, (_, expected) in zip(results, corpus) if expected is not None]
+    correct = sum(1 for result, expected in checked if result is not None and abs(result - expected) < 0.005)
+    accuracy = f", {correct}/{len(checked)} correct" if checked else ""
+    print(f"{name:14s} {len(corpus) / elapsed:10.0f} responses/s ({elapsed * 1e6 / len(corpus):.2f} us each){accuracy}")
+
+
+def main(size: int):
+    recordings = os.getenv("PRICEOVERVIEW_RECORDINGS")
+    corpus = recorded_corpus(recordings) if recordings else synthetic_corpus(size)
+    print(f"{len(corpus)} responses ({'recorded' if recordings else 'synthetic'}), JSON decoder: {json_loads.__module__}")
+    run("legacy", legacy_parse, corpus)
+    run("price_parser", new_parse, corpus)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
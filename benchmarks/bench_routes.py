@@ -0,0 +1,87 @@
+"""Egress routes: one route vs a pool, against a stub Steam with a per-IP limit.
+
+    python -m benchmarks.bench_routes [--requests 400] [--client-rpm 240] [--route-rpm 480]
+
+The stub answers 429 to any client address above `--client-rpm` requests per
+minute. The same priceoverview requests are sent twice, `--concurrency` at a
+time: through a single direct route, then through a pool of a direct route, a
+second source address (127.0.0.2) and two HTTP proxies (benchmarks.stub_proxy)
+leaving from 127.0.0.3 and 127.0.0.4. Each route gets a `--route-rpm` budget.
+Prints throughput, 429s and per-route requests/health for both runs.
+"""
+import os
+
+# Short quarantines so the run finishes in seconds; explicit env settings still win
+os.environ.setdefault("STEAM_429_PAUSE", "2")
+os.environ.setdefault("ROUTE_MAX_QUARANTINE", "10")
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.stub_proxy import start_proxy
+from benchmarks.stub_steam import CATALOG, start_stub
+from egress import RoutePool, parse_route
+from steam_client import SteamClient, PRIORITY_MONITOR
+
+
+async def run(label: str, routes: RoutePool, base: str, steam_app, names):
+    steam_app["client_windows"].clear()
+    steam_app["requests_by_client"].clear()
+    steam_app["throttled_by_client"].clear()
+    client = SteamClient(base_url=f"{base}/market/priceoverview/", routes=routes)
+    await client.start()
+    queue = asyncio.Queue()
+    for name in names:
+        queue.put_nowait(name)
+    priced = 0
+
+    async def worker():
+        nonlocal priced
+        while not queue.empty():
+            _, price = await client.get_price(queue.get_nowait(), PRIORITY_MONITOR)
+            if price is not None:
+                priced += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+
+    print(f"\n{label}: {priced}/{len(names)} priced in {elapsed:.1f}s ({priced / elapsed * 60:.0f}/min), "
+          f"{sum(steam_app['throttled_by_client'].values())} x 429")
+    for name, stats in routes.stats().items():
+        print(f"  {name:28s} requests {stats['requests']:5d}  429 {stats['throttled']:4d}  "
+              f"errors {stats['errors']:3d}  health {stats['health']:.2f}")
+    print("  seen by Steam: " + ", ".join(
+        f"{address} {count}" for address, count in sorted(steam_app["requests_by_client"].items())
+    ))
+
+
+async def main():
+    steam_runner, base = await start_stub(client_rpm=args.client_rpm)
+    proxies = [await start_proxy(outbound_address=address) for address in ("127.0.0.3", "127.0.0.4")]
+    names = random.Random(1).choices(CATALOG, k=args.requests)
+
+    await run("single route", RoutePool([parse_route(f"direct#{args.route_rpm}", 0)]),
+              base, steam_runner.app, names)
+    specs = [f"direct#{args.route_rpm}", f"source:127.0.0.2#{args.route_rpm}"] + [
+        f"{url}#{args.route_rpm}" for _, url in proxies
+    ]
+    await run("route pool", RoutePool([parse_route(spec, i) for i, spec in enumerate(specs)]),
+              base, steam_runner.app, names)
+
+    for runner, _ in proxies:
+        await runner.cleanup()
+    await steam_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--client-rpm", type=int, default=240, help="stub Steam limit per client address")
+    parser.add_argument("--route-rpm", type=int, default=480, help="request budget of each route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main())
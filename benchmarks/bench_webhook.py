@@ -0,0 +1,104 @@
+"""Command round trip: long polling vs webhook, against the fake Telegram API.
+
+    python -m benchmarks.bench_webhook [--updates 300] [--rate 30] [--telegram-latency 0.05] [--command /help]
+
+The fake API (benchmarks.fake_telegram) receives `--updates` commands from
+distinct users at `--rate` per second. In polling mode the dispatcher long-polls
+getUpdates; in webhook mode the fake API POSTs every update to the app built by
+bot.make_webhook_app(). The round trip is update pushed -> reply recorded by
+sendMessage. `--telegram-latency` is added to every API call and to every webhook
+delivery. The default command needs neither Steam nor Postgres.
+"""
+import os
+
+os.environ.setdefault("BOT_TOKEN", "100000001:bench")
+
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from benchmarks.bench_load import summary
+from benchmarks.fake_telegram import fake_bot, message_update, push_update, start_fake_telegram
+from bot import dp, make_webhook_app
+from config import WEBHOOK_PATH
+
+BENCH_USER_BASE = 990_000_000
+SECRET = "bench-secret"
+
+
+async def send_updates(app: web.Application, first_update_id: int):
+    """Pushes the commands at the configured rate; returns {chat_id: pushed at}"""
+    pushed = {}
+    for i in range(args.updates):
+        user_id = BENCH_USER_BASE + first_update_id + i
+        pushed[user_id] = time.perf_counter()
+        push_update(app, message_update(first_update_id + i, user_id, args.command))
+        await asyncio.sleep(1 / args.rate)
+    return pushed
+
+
+async def round_trips(app: web.Application, pushed: dict, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    replied = {}
+    while time.perf_counter() < deadline:
+        for at, chat_id, _ in app["messages"]:
+            if chat_id in pushed and chat_id not in replied:
+                replied[chat_id] = at - pushed[chat_id]
+        if len(replied) == len(pushed):
+            break
+        await asyncio.sleep(0.05)
+    return list(replied.values())
+
+
+async def run_polling(telegram_app: web.Application, base: str) -> dict:
+    bot = fake_bot(base)
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+    await asyncio.sleep(0.5)
+    pushed = await send_updates(telegram_app, 1)
+    samples = await round_trips(telegram_app, pushed)
+    await dp.stop_polling()
+    await polling
+    return {**summary(samples), "lost": len(pushed) - len(samples)}
+
+
+async def run_webhook(telegram_app: web.Application, base: str) -> dict:
+    bot = fake_bot(base)
+    runner = web.AppRunner(make_webhook_app(bot, secret_token=SECRET))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    await bot.set_webhook(f"http://127.0.0.1:{port}{WEBHOOK_PATH}", secret_token=SECRET)
+
+    pushed = await send_updates(telegram_app, args.updates + 1)
+    samples = await round_trips(telegram_app, pushed)
+    await bot.delete_webhook()
+    await runner.cleanup()
+    return {**summary(samples), "lost": len(pushed) - len(samples), "delivery_errors": telegram_app["webhook_errors"]}
+
+
+async def main():
+    runner, base = await start_fake_telegram(latency=args.telegram_latency)
+    result = {
+        "command": args.command,
+        "updates": args.updates,
+        "rate": args.rate,
+        "telegram_latency": args.telegram_latency,
+        "polling": await run_polling(runner.app, base),
+        "webhook": await run_webhook(runner.app, base)
+    }
+    await runner.cleanup()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=30, help="commands per second")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="seconds added to every API call and delivery")
+    parser.add_argument("--command", default="/help")
+    args = parser.parse_args()
+    asyncio.run(main())
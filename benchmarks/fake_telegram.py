@@ -0,0 +1,181 @@
+"""Local stand-in for the Telegram Bot API, enough for the bot's handlers and the notifier.
+
+Point a Bot at it with `fake_bot(base_url)`. Every sendMessage/editMessageText is
+recorded in app["messages"] as (perf_counter timestamp, chat_id, text). Updates
+pushed with `push_update()` are served to getUpdates (long polling supported), or
+POSTed to the URL registered with setWebhook (with its secret token header).
+
+FAKE_TELEGRAM_LATENCY adds seconds to every call (a round trip: getUpdates spends half
+of it before and half after waiting for updates, a webhook delivery only half, one way);
+FAKE_TELEGRAM_429_RATE answers a share of sendMessage calls with "429 retry after 1".
+"""
+import asyncio
+import os
+import random
+import time
+import aiohttp
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+LATENCY = float(os.getenv("FAKE_TELEGRAM_LATENCY", 0))
+RATE_429 = float(os.getenv("FAKE_TELEGRAM_429_RATE", 0))
+BOT_USER = {"id": 100000001, "is_bot": True, "first_name": "Stub Hunter", "username": "stub_hunter_bot"}
+
+
+def fake_bot(base_url: str, token: str = "100000001:bench") -> Bot:
+    return Bot(token=token, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+
+
+def user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    """A private-chat text message update as Telegram would deliver it"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user(user_id),
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] if text.startswith("/") else []
+        }
+    }
+
+
+def push_update(app: web.Application, update: dict):
+    if app["webhook_url"]:
+        task = asyncio.create_task(_deliver(app, update))
+        app["deliveries"].add(task)
+        task.add_done_callback(app["deliveries"].discard)
+        return
+    app["updates"].append(update)
+    app["updates_ready"].set()
+
+
+async def _deliver(app: web.Application, update: dict):
+    """One webhook delivery; failed ones are counted, not retried"""
+    if app["latency"]:
+        await asyncio.sleep(app["latency"] / 2)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": app["webhook_secret"]} if app["webhook_secret"] else {}
+    try:
+        async with app["session"].post(app["webhook_url"], json=update, headers=headers) as response:
+            if response.status != 200:
+                app["webhook_errors"] += 1
+    except aiohttp.ClientError:
+        app["webhook_errors"] += 1
+
+
+def _message(app: web.Application, chat_id, text) -> dict:
+    app["next_message_id"] += 1
+    return {
+        "message_id": app["next_message_id"],
+        "date": int(time.time()),
+        "chat": {"id": int(chat_id), "type": "private"},
+        "from": BOT_USER,
+        "text": text or ""
+    }
+
+
+def _ok(result) -> web.Response:
+    return web.json_response({"ok": True, "result": result})
+
+
+async def get_updates(app: web.Application, params: dict) -> web.Response:
+    if app["latency"]:
+        await asyncio.sleep(app["latency"] / 2)
+    offset = int(params.get("offset") or 0)
+    timeout = float(params.get("timeout") or 0)
+    app["updates"] = [update for update in app["updates"] if update["update_id"] >= offset]
+    if not app["updates"] and timeout:
+        app["updates_ready"].clear()
+        try:
+            await asyncio.wait_for(app["updates_ready"].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    limit = int(params.get("limit") or 100)
+    result = app["updates"][:limit]
+    if app["latency"]:
+        await asyncio.sleep(app["latency"] / 2)
+    return _ok(result)
+
+
+async def api_method(request: web.Request):
+    app = request.app
+    method = request.match_info["method"].lower()
+    if request.content_type == "application/json":
+        params = await request.json()
+    else:
+        params = dict(await request.post())
+    app["calls"][method] = app["calls"].get(method, 0) + 1
+
+    if method == "getupdates":
+        return await get_updates(app, params)
+    if app["latency"]:
+        await asyncio.sleep(app["latency"])
+    if method == "getme":
+        return _ok(BOT_USER)
+    if method in ("sendmessage", "editmessagetext"):
+        if method == "sendmessage" and app["rate_429"] and app["random"].random() < app["rate_429"]:
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1}
+            }, status=429)
+        app["messages"].append((time.perf_counter(), int(params["chat_id"]), params.get("text")))
+        return _ok(_message(app, params["chat_id"], params.get("text")))
+    if method == "getwebhookinfo":
+        return _ok({"url": app["webhook_url"], "has_custom_certificate": False, "pending_update_count": len(app["updates"])})
+    if method == "setwebhook":
+        app["webhook_url"] = params.get("url", "")
+        app["webhook_secret"] = params.get("secret_token", "")
+        return _ok(True)
+    if method == "deletewebhook":
+        app["webhook_url"] = ""
+        if str(params.get("drop_pending_updates")).lower() in ("1", "true"):
+            app["updates"].clear()
+        return _ok(True)
+    # answerCallbackQuery, close, logOut, ...
+    return _ok(True)
+
+
+async def _open_session(app: web.Application):
+    app["session"] = aiohttp.ClientSession()
+    yield
+    await app["session"].close()
+
+
+def make_app(latency: float = LATENCY, rate_429: float = RATE_429) -> web.Application:
+    app = web.Application()
+    app["latency"] = latency
+    app["rate_429"] = rate_429
+    app["random"] = random.Random(1)
+    app["messages"] = []
+    app["calls"] = {}
+    app["updates"] = []
+    app["updates_ready"] = asyncio.Event()
+    app["next_message_id"] = 0
+    app["webhook_url"] = ""
+    app["webhook_secret"] = ""
+    app["webhook_errors"] = 0
+    app["deliveries"] = set()
+    app.cleanup_ctx.append(_open_session)
+    app.router.add_post("/bot{token}/{method}", api_method)
+    return app
+
+
+async def start_fake_telegram(host: str = "127.0.0.1", port: int = 0, latency: float = LATENCY, rate_429: float = RATE_429):
+    """Starts the fake API and returns (runner, base_url); recorded calls live in runner.app"""
+    runner = web.AppRunner(make_app(latency, rate_429))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    web.run_app(make_app(), host="127.0.0.1", port=8082)
@@ -0,0 +1,68 @@
+"""Local stand-in for an HTTP forward proxy, to exercise STEAM_ROUTES offline.
+
+Plain-HTTP requests in absolute form ("GET http://host/path", which is what aiohttp
+sends through an http:// proxy) are forwarded from `outbound_address`, so the stub
+Steam sees each proxy as a different client. Loopback aliases (127.0.0.2, 127.0.0.3,
+...) work without any network setup on Linux.
+
+    runner, proxy_url = await start_proxy(outbound_address="127.0.0.3")
+"""
+import asyncio
+import os
+import aiohttp
+from aiohttp import web
+
+LATENCY = float(os.getenv("STUB_PROXY_LATENCY", 0))
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authorization", "proxy-connection", "te", "trailer",
+              "transfer-encoding", "upgrade", "host", "content-length"}
+
+
+async def forward(request: web.Request):
+    if not request.url.is_absolute() or request.url.scheme != "http":
+        return web.Response(status=400, text="only absolute-form http:// requests are proxied")
+    request.app["forwarded"] += 1
+    if request.app["latency"]:
+        await asyncio.sleep(request.app["latency"])
+
+    headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP}
+    async with request.app["session"].request(
+        request.method, request.url, headers=headers, data=await request.read(), allow_redirects=False
+    ) as upstream:
+        body = await upstream.read()
+        response_headers = {
+            name: value for name, value in upstream.headers.items()
+            if name.lower() not in HOP_BY_HOP and name.lower() != "content-encoding"
+        }
+        return web.Response(status=upstream.status, body=body, headers=response_headers)
+
+
+async def _open_session(app: web.Application):
+    address = app["outbound_address"]
+    connector = aiohttp.TCPConnector(local_addr=(address, 0) if address else None)
+    app["session"] = aiohttp.ClientSession(connector=connector, auto_decompress=True)
+    yield
+    await app["session"].close()
+
+
+def make_app(outbound_address: str = None, latency: float = LATENCY) -> web.Application:
+    app = web.Application()
+    app["outbound_address"] = outbound_address
+    app["latency"] = latency
+    app["forwarded"] = 0
+    app.cleanup_ctx.append(_open_session)
+    app.router.add_route("*", "/{tail:.*}", forward)
+    return app
+
+
+async def start_proxy(host: str = "127.0.0.1", port: int = 0, outbound_address: str = None, latency: float = LATENCY):
+    """Starts the proxy and returns (runner, proxy_url); the forwarded count lives in runner.app"""
+    runner = web.AppRunner(make_app(outbound_address, latency))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    web.run_app(make_app(os.getenv("STUB_PROXY_OUTBOUND_ADDRESS") or None), host="127.0.0.1", port=3128)
@@ -0,0 +1,202 @@
+"""Local stand-in for the Steam Community endpoints used by SteamClient.
+
+Run standalone with `python -m benchmarks.stub_steam` or start it from a
+benchmark via `start_stub()`.
+
+Market search pages are generated from a synthetic catalog. To replay recorded
+pages instead, point STUB_STEAM_RECORDINGS at a directory of JSON responses
+from /market/search/render/?norender=1 named `<query>@<start>.json` (an empty
+query is recorded as `_`).
+
+Slow or throttling Steam can be simulated with STUB_STEAM_LATENCY (seconds added
+to every response) and STUB_STEAM_429_RATE (share of requests answered with 429),
+or the `latency` / `rate_429` arguments of `start_stub()`. STUB_STEAM_CLIENT_RPM
+(`client_rpm`) answers 429 to any client address sending more than that many
+requests per minute, like Steam's per-IP limit; with STUB_STEAM_RETRY_AFTER=1
+(`retry_after`) those 429s carry a Retry-After header.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from pathlib import Path
+from aiohttp import web
+
+WEAPONS = [
+    "AK-47", "M4A4", "M4A1-S", "AWP", "Desert Eagle", "USP-S", "Glock-18", "P250", "FAMAS", "Galil AR",
+    "SSG 08", "MP9", "MAC-10", "UMP-45", "P90", "Five-SeveN", "Tec-9", "CZ75-Auto", "Nova", "XM1014"
+]
+FINISHES = [
+    "Redline", "Asiimov", "Vulcan", "Hyper Beast", "Neo-Noir", "Slate", "Printstream", "Fire Serpent",
+    "Bloodsport", "Neon Rider", "Case Hardened", "Fade", "Doppler", "Safari Mesh", "Boreal Forest",
+    "Night", "Urban DDPAT", "Forest Leaves", "Blue Laminate", "Elite Build", "Phantom Disruptor",
+    "Nightwish", "Head Shot", "Ice Coaled", "Leet Museo"
+]
+WEARS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+
+
+def catalog():
+    """Sorted synthetic list of market_hash_names (20 weapons x 25 finishes x 5 wears x normal/StatTrak)"""
+    names = []
+    for weapon in WEAPONS:
+        for finish in FINISHES:
+            for wear in WEARS:
+                names.append(f"{weapon} | {finish} ({wear})")
+                names.append(f"StatTrak™ {weapon} | {finish} ({wear})")
+    return sorted(names)
+
+
+CATALOG = catalog()
+RECORDINGS = os.getenv("STUB_STEAM_RECORDINGS")
+LATENCY = float(os.getenv("STUB_STEAM_LATENCY", 0))
+RATE_429 = float(os.getenv("STUB_STEAM_429_RATE", 0))
+CLIENT_RPM = int(os.getenv("STUB_STEAM_CLIENT_RPM", 0))
+RETRY_AFTER = os.getenv("STUB_STEAM_RETRY_AFTER", "0") == "1"
+
+
+def fake_price(name: str) -> float:
+    digest = hashlib.md5(name.encode()).digest()
+    return round(0.03 + int.from_bytes(digest[:4], "little") % 50000 / 100, 2)
+
+
+async def price_overview(request: web.Request):
+    name = request.query.get("market_hash_name", "")
+    request.app["priceoverview_requests"] += 1
+    return web.json_response({
+        "success": True,
+        "lowest_price": f"${fake_price(name):,.2f}",
+        "volume": "1,024",
+        "median_price": f"${fake_price(name + '#median'):,.2f}"
+    })
+
+
+async def market_search(request: web.Request):
+    query = request.query.get("query", "")
+    start = int(request.query.get("start", 0))
+    count = min(int(request.query.get("count", 10)), 100)
+    request.app["search_requests"] += 1
+
+    if RECORDINGS:
+        path = Path(RECORDINGS) / f"{query or '_'}@{start}.json"
+        if path.exists():
+            return web.json_response(json.loads(path.read_text(encoding="utf-8")))
+        return web.json_response({"success": True, "start": start, "pagesize": count, "total_count": 0, "results": []})
+
+    # Like Steam, every word of the query has to appear somewhere in the name
+    needles = query.lower().split()
+    matches = [name for name in CATALOG if all(needle in name.lower() for needle in needles)]
+    page = matches[start:start + count]
+    return web.json_response({
+        "success": True,
+        "start": start,
+        "pagesize": count,
+        "total_count": len(matches),
+        "results": [
+            {
+                "name": name,
+                "hash_name": name,
+                "sell_listings": 25,
+                "sell_price": int(fake_price(name) * 100),
+                "sell_price_text": f"${fake_price(name):,.2f}",
+                "app_name": "Counter-Strike 2",
+                "asset_description": {"appid": 730, "market_hash_name": name, "commodity": 0}
+            }
+            for name in page
+        ]
+    })
+
+
+INVENTORY_SIZE = 2500
+
+
+async def inventory(request: web.Request):
+    """Paged inventory of INVENTORY_SIZE assets spread over 300 item types from the catalog"""
+    count = int(request.query.get("count", 100))
+    start = int(request.query.get("start_assetid", 0))
+    end = min(start + count, INVENTORY_SIZE)
+    assets = [
+        {"assetid": str(i), "classid": str(1000 + i % 300), "instanceid": "0", "amount": "1"}
+        for i in range(start, end)
+    ]
+    classids = {asset["classid"] for asset in assets}
+    data = {
+        "assets": assets,
+        "descriptions": [
+            {
+                "classid": classid,
+                "instanceid": "0",
+                "market_hash_name": CATALOG[int(classid) * 17 % len(CATALOG)],
+                "marketable": 0 if classid.endswith("7") else 1
+            }
+            for classid in sorted(classids)
+        ],
+        "total_inventory_count": INVENTORY_SIZE,
+        "success": 1
+    }
+    if end < INVENTORY_SIZE:
+        data["more_items"] = 1
+        data["last_assetid"] = str(end)
+    return web.json_response(data)
+
+
+@web.middleware
+async def injected_faults(request: web.Request, handler):
+    """Adds the configured latency and answers a share of requests, or requests over
+    the per-client budget, with 429"""
+    app = request.app
+    app["requests_by_client"][request.remote] += 1
+    if app["latency"]:
+        await asyncio.sleep(app["latency"])
+    if app["client_rpm"]:
+        now = time.monotonic()
+        window = app["client_windows"].setdefault(request.remote, deque())
+        while window and window[0] <= now - 60:
+            window.popleft()
+        if len(window) >= app["client_rpm"]:
+            app["throttled_requests"] += 1
+            app["throttled_by_client"][request.remote] += 1
+            retry_after = max(int(window[0] + 60 - now) + 1, 1) if app["retry_after"] else None
+            return web.Response(status=429, headers={"Retry-After": str(retry_after)} if retry_after else None)
+        window.append(now)
+    if app["rate_429"] and app["random"].random() < app["rate_429"]:
+        app["throttled_requests"] += 1
+        return web.Response(status=429)
+    return await handler(request)
+
+
+def make_app(latency: float = LATENCY, rate_429: float = RATE_429, client_rpm: int = CLIENT_RPM,
+             retry_after: bool = RETRY_AFTER) -> web.Application:
+    app = web.Application(middlewares=[injected_faults])
+    app["latency"] = latency
+    app["rate_429"] = rate_429
+    app["client_rpm"] = client_rpm
+    app["retry_after"] = retry_after
+    app["client_windows"] = {}
+    app["requests_by_client"] = Counter()
+    app["throttled_by_client"] = Counter()
+    app["random"] = random.Random(730)
+    app["priceoverview_requests"] = 0
+    app["search_requests"] = 0
+    app["throttled_requests"] = 0
+    app.router.add_get("/market/priceoverview/", price_overview)
+    app.router.add_get("/market/search/render/", market_search)
+    app.router.add_get("/inventory/{steam_id}/730/2", inventory)
+    return app
+
+
+async def start_stub(host: str = "127.0.0.1", port: int = 0, latency: float = LATENCY, rate_429: float = RATE_429,
+                     client_rpm: int = CLIENT_RPM, retry_after: bool = RETRY_AFTER):
+    """Starts the stub and returns (runner, base_url); request counters live in runner.app"""
+    runner = web.AppRunner(make_app(latency, rate_429, client_rpm, retry_after))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    web.run_app(make_app(), host="127.0.0.1", port=8081)
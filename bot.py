@@ -1,18 +1,46 @@
 import asyncio
-import aiohttp
-import random
-import re
+import signal
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from config import BOT_TOKEN, UAH_RATE
+from config import (
+    BOT_TOKEN, MONITOR_MODE, METRICS_HOST, METRICS_PORT, BOT_MODE,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, SHUTDOWN_TIMEOUT
+)
 from database import db
-from steam_client import SteamClient
+from steam_client import SteamClient, PRIORITY_INTERACTIVE, WEAR_SUFFIX, market_search_query
+from price_cache import PriceCache
+from portfolio import get_portfolio, format_portfolio, import_inventory, price_imported, price_in_background
+from history import get_history, format_history
+from valuation import value_inventory
+from inventory import InventoryStore
 from monitor import start_monitoring
+from metrics import HandlerMetricsMiddleware, start_metrics_server
+from fx import fx, user_currency, run_fx_refresher, BASE_CURRENCY
+from catalog import catalog
 
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
+dp.message.middleware(HandlerMetricsMiddleware())
+dp.callback_query.middleware(HandlerMetricsMiddleware())
+
+# Tasks currently processing an update, awaited on shutdown
+pending_updates = set()
+
+@dp.update.outer_middleware()
+async def track_pending_updates(handler, event, data):
+    task = asyncio.current_task()
+    pending_updates.add(task)
+    try:
+        return await handler(event, data)
+    finally:
+        pending_updates.discard(task)
+
+# Search terms already looked up by resolve_skin(): the catalog has everything Steam listed for them
+searched_terms = set()
 
 HELP_TEXT = (
     "🤖 **Довідка Steam Skin Hunter**\n\n"
@@ -21,13 +49,43 @@ HELP_TEXT = (
     "• Приклад: `/alert AWP | Asiimov 45.00`\n\n"
     "🔍 **Аналіз ринку:**\n"
     "• `/find <назва>` — перевірити ціну скіна.\n"
-    "• `/check <посилання>` — оцінити весь інвентар (посилання має містити `profiles/765...`).\n\n"
+    "• `/check <посилання>` — оцінити весь інвентар (посилання має містити `profiles/765...`).\n"
+    "• `/history <назва>` — динаміка ціни: мін/макс/середня, зміна за 24г/7д/30д, ковзні середні.\n\n"
     "💼 **Портфель:**\n"
     "• `/add <назва> [ціна]` — додати скін. Якщо вказати ціну, бот рахуватиме прибуток.\n"
+    "• `/import <посилання>` — додати в портфель усі предмети з інвентарю (з кількістю).\n"
     "• `/del <назва>` — видалити скін зі списку.\n"
-    "• `/prices` — показати твій портфель, загальну вартість та PnL (прибуток)."
+    "• `/prices` — показати твій портфель, загальну вартість та PnL (прибуток).\n\n"
+    "💱 **Валюта:**\n"
+    "• `/currency <код>` — валюта відображення цін (напр. `/currency UAH`). Ціни в командах вводяться в ній."
 )
 
+async def resolve_skin(message: types.Message, query: str, prices: PriceCache):
+    """Canonical market_hash_name for user input. Ambiguous input gets suggestions without a
+    Steam request; unknown or full-name input costs one market search (which teaches the
+    catalog that page). Without a single match the user is answered and None is returned."""
+    query = query.strip()
+    match = catalog.resolve(query)
+    # Input shaped like a full name ("AK-47 | Redline (Field-Tested)") may just be missing
+    # from the catalog: confirm it instead of offering look-alikes
+    full_name = "|" in query or WEAR_SUFFIX.search(query)
+    term = market_search_query(query).lower()
+    if match.name is None and (full_name or not match.suggestions) and term not in searched_terms:
+        if await prices.get_prices_bulk([query], PRIORITY_INTERACTIVE):
+            searched_terms.add(term)
+        match = catalog.resolve(query)
+    if match.name:
+        return match.name
+
+    if match.suggestions:
+        options = "\n".join(f"• `{name}`" for name in match.suggestions)
+        await message.answer(f"🤔 Точної назви `{query}` немає. Можливо, малося на увазі:\n{options}", parse_mode="Markdown")
+    elif not prices.client.available():
+        await message.answer("⏳ Steam зараз недоступний, а такої назви ще немає в каталозі. Спробуй пізніше.")
+    else:
+        await message.answer(f"❌ Не знайдено: `{query}`", parse_mode="Markdown")
+    return None
+
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
     kb = [
@@ -54,7 +112,7 @@ async def cmd_help(message: types.Message):
     await message.answer(HELP_TEXT, parse_mode="Markdown")
 
 @dp.message(Command("alert"))
-async def cmd_alert(message: types.Message):
+async def cmd_alert(message: types.Message, prices: PriceCache):
     user_id = message.from_user.id
     args = message.text.split()
     
@@ -69,21 +127,28 @@ async def cmd_alert(message: types.Message):
         await message.answer("⚠️ Помилка в ціні. Використовуй крапку: 14.50")
         return
 
+    skin_name = await resolve_skin(message, skin_name, prices)
+    if not skin_name:
+        return
+
+    currency = await user_currency(user_id)
+    target_usd = fx.to_usd(target_price, currency)
+
     await db.add_track_skin(user_id, skin_name) 
     
-    success = await db.set_alert_price(user_id, skin_name, target_price)
+    success = await db.set_alert_price(user_id, skin_name, target_usd)
     
     if success:
         await message.answer(
             f"🔔 **Сповіщення встановлено!**\n\n"
-            f"Я напишу тобі, коли **{skin_name}** буде дешевше **{target_price} $**.",
+            f"Я напишу тобі, коли **{skin_name}** буде дешевше **{fx.format(target_usd, currency)}**.",
             parse_mode="Markdown"
         )
     else:
         await message.answer("❌ Помилка бази даних.")
 
 @dp.message(Command("add"))
-async def cmd_add(message: types.Message):
+async def cmd_add(message: types.Message, prices: PriceCache):
     user_id = message.from_user.id
     args = message.text.split()
 
@@ -109,24 +174,29 @@ async def cmd_add(message: types.Message):
          await message.answer("⚠️ Некоректна назва скіна.")
          return
 
+    skin_name = await resolve_skin(message, skin_name, prices)
+    if not skin_name:
+        return
+
+    currency = await user_currency(user_id)
+    if buy_price:
+        buy_price = fx.to_usd(buy_price, currency)
+
     success = await db.add_track_skin(user_id, skin_name, buy_price)
     
     if success:
         msg_text = f"✅ Скін **{skin_name}** додано!"
         if buy_price:
-            msg_text += f"\n🎯 Цільова ціна покупки: **{buy_price} $**"
+            msg_text += f"\n🎯 Цільова ціна покупки: **{fx.format(buy_price, currency)}**"
         
         status_msg = await message.answer(msg_text + "\n⏳ **Отримую актуальну ціну...**", parse_mode="Markdown")
 
-        client = SteamClient()
         try:
-            async with aiohttp.ClientSession() as session:
-                _, current_price = await client.get_price(session, skin_name)
-                
+            _, current_price = await prices.get_price(skin_name)
+
             if current_price:
-                await db.add_price(skin_name, current_price)
                 await status_msg.edit_text(
-                    msg_text + f"\n💵 Поточна ціна: **{current_price} $**", 
+                    msg_text + f"\n💵 Поточна ціна: **{fx.format(current_price, currency)}**", 
                     parse_mode="Markdown"
                 )
             else:
@@ -145,16 +215,14 @@ async def cmd_add(message: types.Message):
              await message.answer(f"ℹ️ Скін **{skin_name}** вже є у твоєму списку.", parse_mode="Markdown")
 
 @dp.message(Command("check"))
-async def cmd_check_inventory(message: types.Message):
+async def cmd_check_inventory(message: types.Message, steam: SteamClient, prices: PriceCache, inventories: InventoryStore):
     args = message.text.split()
     if len(args) < 2:
         await message.answer("⚠️ Приклад: `/check https://steamcommunity.com/profiles/7656...`", parse_mode="Markdown")
         return
 
     url = args[1]
-    client = SteamClient()
-
-    steam_id = client.extract_steam_id(url)
+    steam_id = steam.extract_steam_id(url)
     
     if not steam_id:
         await message.answer("❌ Не знайдено SteamID (використовуй посилання з `7656...`).")
@@ -162,75 +230,97 @@ async def cmd_check_inventory(message: types.Message):
 
     status_msg = await message.answer(f"🔍 Сканую ID: `{steam_id}`...\n🐢 Увімкнено режим 'Лінивець' (обхід бану Steam)...", parse_mode="Markdown")
 
-    async with aiohttp.ClientSession() as session:
-        inventory = await client.get_inventory(session, steam_id)
-        
-        if not inventory:
-            await status_msg.edit_text("❌ Інвентар порожній, прихований або помилка Steam (спробуй пізніше).")
-            return
+    inventory = await inventories.get_inventory(steam_id)
+    
+    if not inventory:
+        await status_msg.edit_text("❌ Інвентар порожній, прихований або помилка Steam (спробуй пізніше).")
+        return
 
-        unique_items = len(inventory)
-        await status_msg.edit_text(f"📦 Унікальних предметів: {unique_items}.\n☕ Починаю повну оцінку. Це довго, але точно.")
+    unique_items = len(inventory)
+    await status_msg.edit_text(f"📦 Унікальних предметів: {unique_items}.\n☕ Починаю оцінку...")
 
-        total_sum = 0
-        priced_items = []
-        failed_items = [] 
+    async def on_progress(done: int, total: int, skin_name: str):
+        percent = (done / total) * 100 if total else 100
+        text = f"⏳ Оцінка {done}/{total} ({percent:.1f}%)"
+        if skin_name:
+            text += f":\n`{skin_name}`..."
+        try:
+            await status_msg.edit_text(text, parse_mode="Markdown")
+        except Exception as e:
+            print(f"Progress update failed: {e}")
 
-        items_list = list(inventory.keys())
-        
-        for i, skin_name in enumerate(items_list, 1):
-            if i % 5 == 0 or i == 1:
-                percent = (i / unique_items) * 100
-                await status_msg.edit_text(f"⏳ Оцінка {i}/{unique_items} ({percent:.1f}%):\n`{skin_name}`...", parse_mode="Markdown")
-
-            price = None
-            retries = 5
-            
-            for attempt in range(retries):
-                _, fetched_price = await client.get_price(session, skin_name)
-                
-                if fetched_price is not None:
-                    price = fetched_price
-                    sleep_time = random.uniform(2.5, 4.0) 
-                    await asyncio.sleep(sleep_time)
-                    break 
-                else:
-                    wait_time = 10 + (attempt * 10)
-                    if attempt == retries - 1:
-                         break
-
-                    if attempt > 1:
-                        await status_msg.edit_text(f"⛔ Steam думає... ({skin_name})\n💤 Чекаю {wait_time} с...")
-                    
-                    await asyncio.sleep(wait_time)
-
-            if price:
-                count = inventory[skin_name]
-                item_total = price * count
-                total_sum += item_total
-                priced_items.append((skin_name, price, count, item_total))
-            else:
-                failed_items.append(skin_name)
+    valuation = await value_inventory(steam_id, inventory, prices, on_progress)
+    priced_items = valuation.priced
+    failed_items = valuation.failed
+    total_sum = valuation.total
+    currency = await user_currency(message.from_user.id)
+    # The second total is the "other" currency: UAH for USD users, USD for everyone else
+    approx_currency = "UAH" if currency == BASE_CURRENCY and fx.supports("UAH") else BASE_CURRENCY
+
+    report = f"📊 **Інвентар гравця:**\nID: `{steam_id}`\n\n"
+
+    for item in priced_items[:15]:
+        name, p, c, t = item
+        report += f"✅ {name} (x{c}) — **{fx.format(p, currency)}** (Σ {fx.convert(t, currency):.2f})\n"
+
+    if len(priced_items) > 15:
+         report += f"...і ще {len(priced_items) - 15} позицій.\n"
+
+    if failed_items:
+        report += f"\n⚠️ **Пропущено {len(failed_items)} предметів** (Steam не віддав ціну)\n"
+
+    report += "\n" + "-"*20 + "\n"
+    report += f"💰 **ВСЬОГО: {fx.format(total_sum, currency)}**"
+    if approx_currency != fx.resolve(currency):
+        report += f" (≈ {fx.format(total_sum, approx_currency, digits=0)})"
 
-        priced_items.sort(key=lambda x: x[3], reverse=True)
-        total_uah = total_sum * UAH_RATE
+    await status_msg.edit_text(report, parse_mode="Markdown")
 
-        report = f"📊 **Інвентар гравця:**\nID: `{steam_id}`\n\n"
+@dp.message(Command("import"))
+async def cmd_import(message: types.Message, steam: SteamClient, prices: PriceCache, inventories: InventoryStore,
+                     background_tasks: list):
+    args = message.text.split()
+    if len(args) < 2:
+        await message.answer("⚠️ Приклад: `/import https://steamcommunity.com/profiles/7656...`", parse_mode="Markdown")
+        return
+
+    steam_id = steam.extract_steam_id(args[1])
+    if not steam_id:
+        await message.answer("❌ Не знайдено SteamID (використовуй посилання з `7656...`).")
+        return
 
-        for item in priced_items[:15]:
-            name, p, c, t = item
-            report += f"✅ {name} (x{c}) — **{p} $** (Σ {t:.2f})\n"
+    status_msg = await message.answer(f"🔍 Сканую ID: `{steam_id}`...", parse_mode="Markdown")
 
-        if len(priced_items) > 15:
-             report += f"...і ще {len(priced_items) - 15} позицій.\n"
+    inventory = await inventories.get_inventory(steam_id)
+    if not inventory:
+        await status_msg.edit_text("❌ Інвентар порожній, прихований або помилка Steam (спробуй пізніше).")
+        return
 
-        if failed_items:
-            report += f"\n⚠️ **Пропущено {len(failed_items)} предметів** (Steam не віддав ціну)\n"
+    result = await import_inventory(message.from_user.id, inventory, prices)
+    if result is None:
+        await status_msg.edit_text("❌ Помилка бази даних, спробуй пізніше.")
+        return
 
-        report += "\n" + "-"*20 + "\n"
-        report += f"💰 **ВСЬОГО: {total_sum:.2f} $** (≈ {total_uah:.0f} ₴)"
+    text = (
+        f"✅ **Імпорт завершено:** {sum(inventory.values())} шт., {len(inventory)} позицій\n"
+        f"➕ Нових: {result.added} | 🔄 Оновлено кількість: {result.updated}\n"
+        f"💵 З ціною: {result.priced}"
+    )
+    if not result.unpriced:
+        await status_msg.edit_text(text + "\n\nПортфель: /prices", parse_mode="Markdown")
+        return
 
-        await status_msg.edit_text(report, parse_mode="Markdown")
+    await status_msg.edit_text(text + f"\n⏳ Отримую ціни ще для {len(result.unpriced)}...", parse_mode="Markdown")
+    unpriced = await price_imported(result.unpriced, prices)
+    priced = len(result.unpriced) - len(unpriced)
+    text = text.replace(f"💵 З ціною: {result.priced}", f"💵 З ціною: {result.priced + priced}")
+    if unpriced:
+        # The rest is priced in the monitor lane; /prices picks the prices up as they arrive
+        task = asyncio.create_task(price_in_background(unpriced, prices))
+        background_tasks.append(task)
+        task.add_done_callback(background_tasks.remove)
+        text += f"\n⏳ Ще {len(unpriced)} підтягнуться у фоні за кілька хвилин"
+    await status_msg.edit_text(text + "\n\nПортфель: /prices", parse_mode="Markdown")
 
 @dp.message(Command("remove", "del"))
 async def cmd_remove(message: types.Message):
@@ -250,105 +340,100 @@ async def cmd_remove(message: types.Message):
     else:
         await message.answer(f"❌ Не знайшов **{skin_name}** у твоєму списку.", parse_mode="Markdown")
 
-@dp.message(Command("prices"))
-async def cmd_prices(message: types.Message):
-    user_id = message.from_user.id
-    tracked_items = await db.get_user_items(user_id)
-    
-    if not tracked_items:
+async def send_portfolio(message: types.Message, user_id: int):
+    portfolio = await get_portfolio(user_id)
+
+    if not portfolio.items:
         await message.answer("📭 Твій список порожній.", parse_mode="Markdown")
         return
 
-    latest_prices_rows = await db.get_latest_price()
-    market_prices = {row['skin_name']: row['price'] for row in latest_prices_rows}
+    currency = await user_currency(user_id)
+    await message.answer(format_portfolio(portfolio, currency), parse_mode="Markdown")
 
-    response = "📊 **Твій портфель:**\n\n"
-    
-    total_buy_cost = 0 
-    total_market_value = 0  
-    total_net_value = 0     
-
-    for item in tracked_items:
-        name = item['skin_name']
-        buy_price = item['buy_price']
-        target_price = item.get('target_price')
-        
-        market_price = market_prices.get(name)
-
-        if market_price:
-            market_price = float(market_price)
-            net_price = market_price / 1.15
-            
-            line = f"🔹 **{name}**\n"
-            line += f"   💵 Steam: {market_price} $\n"
-            line += f"   🤲 На руки: **{net_price:.2f} $**"
-
-            if buy_price:
-                diff = market_price - buy_price
-                percent = (diff / buy_price) * 100 if buy_price > 0 else 0
-                emoji = "🟢" if diff >= 0 else "🔴"
-                sign = "+" if diff >= 0 else ""
-                
-                line += f" | Купив: {buy_price} $\n   {emoji} PnL: **{sign}{diff:.2f} $ ({sign}{percent:.1f}%)**"
-                total_buy_cost += buy_price
-
-            if target_price:
-                line += f"\n   🔔 Алерт: **< {target_price} $**"
-
-            total_market_value += market_price
-            total_net_value += net_price
-            
-            response += line + "\n\n"
-        else:
-            response += f"🔹 **{name}**\n   ⏳ Очікування...\n\n"
-
-    if total_market_value > 0:
-        total_diff = total_market_value - total_buy_cost
-        total_diff_commision = total_net_value - total_buy_cost
-        total_percent = (total_diff / total_buy_cost) * 100 if total_buy_cost > 0 else 0
-        total_percent_commision = (total_diff_commision / total_buy_cost) * 100 if total_buy_cost > 0 else 0
-        emoji = "🚀" if total_diff >= 0 else "🔻"
-        emoji_commision = "🚀" if total_diff_commision >= 0 else "🔻"
-        sign = "+" if total_diff >= 0 else ""
-        sign_commision = "+" if total_diff_commision >= 0 else ""
-        
-        response += "-"*25 + "\n"
-        response += f"💰 **БАЛАНС:**\n"
-        response += f"🏦 Активи (Steam): **{total_market_value:.2f} $**\n"
-        response += f"🤲 Якщо продати зараз: **{total_net_value:.2f} $**\n"
-        
-        if total_buy_cost > 0:
-            response += f"\n📊 Інвестовано: {total_buy_cost:.2f} $\n"
-            response += f"{emoji} Профіт (Paper): **{sign}{total_diff:.2f} $ ({sign}{total_percent:.1f}%)**\n"
-            response += f"{emoji_commision} Профіт після продажу: **{sign_commision}{total_diff_commision:.2f} $ ({sign_commision}{total_percent_commision:.1f}%)**"
+@dp.message(Command("prices"))
+async def cmd_prices(message: types.Message):
+    await send_portfolio(message, message.from_user.id)
 
-    await message.answer(response, parse_mode="Markdown")
+@dp.message(Command("history"))
+async def cmd_history(message: types.Message):
+    args = message.text.split(maxsplit=1)
+    if len(args) < 2:
+        await message.answer("ℹ️ Приклад: `/history AK-47 | Redline (Field-Tested)`", parse_mode="Markdown")
+        return
+
+    skin_name = args[1].strip()
+    history = await get_history(skin_name)
+    if history is None:
+        await message.answer(f"📭 Ще немає історії цін для **{skin_name}**.", parse_mode="Markdown")
+        return
+
+    currency = await user_currency(message.from_user.id)
+    await message.answer(format_history(history, currency), parse_mode="Markdown")
 
 @dp.message(Command("find"))
-async def cmd_find(message: types.Message):
+async def cmd_find(message: types.Message, prices: PriceCache):
     skin_name = message.text.replace("/find", "").strip()
     if not skin_name:
         await message.answer("ℹ️ Введіть назву.\nПриклад: `/find AWP | Asiimov`", parse_mode="Markdown")
         return
 
+    skin_name = await resolve_skin(message, skin_name, prices)
+    if not skin_name:
+        return
+
     status_msg = await message.answer(f"🔍 Шукаю: **{skin_name}**...", parse_mode="Markdown")
 
-    client = SteamClient()
-    async with aiohttp.ClientSession() as session:
-        _, price = await client.get_price(session, skin_name)
+    _, price = await prices.get_price(skin_name)
 
     if price:
+        currency = await user_currency(message.from_user.id)
+        details = ""
+        overview = prices.overview(skin_name)
+        if overview and overview.median:
+            details += f"\n📊 Медіана: {fx.format(overview.median, currency)}"
+        if overview and overview.volume is not None:
+            details += f"\n🔄 Продано за 24г: {overview.volume}"
         await status_msg.edit_text(
-            f"✅ **{skin_name}**\n💰 Ціна: **{price} $**\n\nДодати: `/add {skin_name}`",
+            f"✅ **{skin_name}**\n💰 Ціна: **{fx.format(price, currency)}**{details}\n\nДодати: `/add {skin_name}`",
             parse_mode="Markdown"
         )
     else:
         await status_msg.edit_text(f"❌ Не знайдено: `{skin_name}`", parse_mode="Markdown")
 
+@dp.message(Command("currency"))
+async def cmd_currency(message: types.Message):
+    user_id = message.from_user.id
+    args = message.text.split()
+
+    if len(args) < 2:
+        currency = await user_currency(user_id)
+        available = fx.available()
+        shown = ", ".join(available[:15]) + (", ..." if len(available) > 15 else "")
+        await message.answer(
+            f"💱 Валюта відображення: **{currency}**\n"
+            f"Доступні: {shown}\n"
+            f"Змінити: `/currency UAH`",
+            parse_mode="Markdown"
+        )
+        return
+
+    currency = args[1].upper()
+    if not fx.supports(currency):
+        await message.answer(f"❌ Невідома валюта: `{currency}`", parse_mode="Markdown")
+        return
+
+    if await db.set_user_currency(user_id, currency):
+        await message.answer(
+            f"✅ Ціни показуватимуться в **{currency}** (1 $ = {fx.format(1, currency, digits=4)}).",
+            parse_mode="Markdown"
+        )
+    else:
+        await message.answer("❌ Помилка бази даних.")
+
 @dp.callback_query(F.data == "show_prices")
 async def btn_show_prices(callback: CallbackQuery):
     await callback.answer()
-    await cmd_prices(callback.message)
+    await send_portfolio(callback.message, callback.from_user.id)
 
 @dp.callback_query(F.data == "show_help")
 async def btn_show_help(callback: CallbackQuery):
@@ -358,22 +443,110 @@ async def btn_show_help(callback: CallbackQuery):
 @dp.callback_query(F.data == "ask_portfolio")
 async def btn_ask_portfolio(callback: CallbackQuery):
     await callback.answer()
-    await callback.message.answer("🎒 Інвентар: `/check <посилання>`", parse_mode="Markdown")
+    await callback.message.answer(
+        "🎒 Інвентар: `/check <посилання>`\n📥 Додати в портфель: `/import <посилання>`",
+        parse_mode="Markdown"
+    )
 
-async def main():
+async def on_startup(dispatcher: Dispatcher, bot: Bot):
+    """Opens the DB pool and Steam sessions and starts background work before any update is handled"""
     await db.connect()
     await db.create_tables()
+    await catalog.load()
+
+    steam = SteamClient()
+    await steam.start()
+    prices = PriceCache(steam)
+    # Passed to handlers like any other workflow data
+    dispatcher["steam"] = steam
+    dispatcher["prices"] = prices
+    dispatcher["inventories"] = InventoryStore(steam)
+
+    tasks = [asyncio.create_task(run_fx_refresher())]
+    if METRICS_PORT:
+        dispatcher["metrics_runner"] = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+    if MONITOR_MODE == "embedded":
+        tasks.append(asyncio.create_task(start_monitoring(bot, prices)))
+        print("Background monitoring started")
+    else:
+        print("Monitoring is handled by standalone workers (worker.py)")
+    dispatcher["background_tasks"] = tasks
+
+    if BOT_MODE == "webhook":
+        if WEBHOOK_URL:
+            # Every replica registers the same URL; pending updates are kept for whoever is up
+            await bot.set_webhook(
+                WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                allowed_updates=dispatcher.resolve_used_update_types()
+            )
+        else:
+            print("WEBHOOK_URL is not set: the webhook must be registered elsewhere")
+    else:
+        await bot.delete_webhook(drop_pending_updates=True)
+    print(f"Bot is online and ready! ({BOT_MODE})")
+
+async def on_shutdown(dispatcher: Dispatcher):
+    """Lets running commands finish, then stops background work and closes the Steam sessions and the DB pool"""
+    pending = pending_updates - {asyncio.current_task()}
+    if pending:
+        print(f"Waiting for {len(pending)} running updates...")
+        await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+
+    tasks = dispatcher.workflow_data.pop("background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    metrics_runner = dispatcher.workflow_data.pop("metrics_runner", None)
+    if metrics_runner:
+        await metrics_runner.cleanup()
+    steam = dispatcher.workflow_data.get("steam")
+    if steam:
+        await steam.close()
+    await db.close()
+
+async def healthz(request: web.Request):
+    return web.Response(text="ok")
+
+def make_webhook_app(webhook_bot: Bot = bot, secret_token: str = WEBHOOK_SECRET) -> web.Application:
+    """aiohttp app serving Telegram updates on WEBHOOK_PATH (and /healthz for load balancers);
+    its startup/shutdown run on_startup/on_shutdown. Updates without `secret_token` are rejected"""
+    if not secret_token:
+        # Without a secret anyone who finds the URL can post forged updates
+        raise ValueError("Webhook mode needs WEBHOOK_SECRET")
+    app = web.Application()
+    # Registered before the request handler, so on_shutdown runs before the bot session is closed
+    setup_application(app, dp, bot=webhook_bot)
+    SimpleRequestHandler(dispatcher=dp, bot=webhook_bot, secret_token=secret_token).register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+async def run_webhook():
+    runner = web.AppRunner(make_webhook_app())
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    print(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
 
-    asyncio.create_task(start_monitoring(bot))
-    print("Background monitoring started")
-
-    await bot.delete_webhook(drop_pending_updates=True)
-    print("Bot is online and ready!")
-
-    await dp.start_polling(bot)
+async def main():
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    if BOT_MODE == "webhook":
+        await run_webhook()
+    else:
+        await dp.start_polling(bot)
 
 if __name__ == '__main__':
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("Bot stopped manually")
\ No newline at end of file
+        print("Bot stopped manually")
@@ -0,0 +1,224 @@
+"""Local catalog of valid market_hash_names, so user input resolves to a canonical
+name without a Steam request.
+
+Names are learned from what the bot already fetches (priceoverview answers, market
+search pages, inventory descriptions) and persisted in `market_items`. Lookups use
+an in-memory word index (every query word is a prefix of a word of the name, in any
+order; "ft", "st", ... expand to wears/StatTrak) kept as bitmasks, with a trigram
+fallback for typos.
+"""
+import bisect
+import re
+import numpy as np
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from config import CATALOG_SUGGESTIONS
+from database import db
+from steam_client import WEAR_SUFFIX
+
+_WORDS = re.compile(r"[^\W_]+")
+# Trigram similarity below this is not offered as a suggestion
+MIN_SIMILARITY = 0.3
+# Cached prefix bitmasks (each len(catalog) / 8 bytes) kept before the cache is reset
+PREFIX_CACHE_SIZE = 4096
+# Short forms users type for wears and StatTrak
+ALIASES = {
+    "fn": ("factory", "new"), "mw": ("minimal", "wear"), "ft": ("field", "tested"),
+    "ww": ("well", "worn"), "bs": ("battle", "scarred"), "st": ("stattrak",)
+}
+WEAR_WORDS = {word for alias, words in ALIASES.items() if alias != "st" for word in words}
+
+def tokens(text: str) -> List[str]:
+    """"StatTrak™ AK-47 | Redline (Field-Tested)" -> ["stattrak", "ak", "47", "redline", "field", "tested"]"""
+    return _WORDS.findall(text.lower())
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _mask(ids: Iterable[int], size: int) -> int:
+    bits = bytearray(size // 8 + 1)
+    for name_id in ids:
+        bits[name_id >> 3] |= 1 << (name_id & 7)
+    return int.from_bytes(bits, "little")
+
+def _bits(mask: int, limit: int) -> List[int]:
+    """Up to `limit` set bit positions of mask, lowest first"""
+    ids = []
+    while mask and len(ids) < limit:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+class Match(NamedTuple):
+    name: Optional[str]
+    suggestions: List[str]
+
+class Catalog:
+    def __init__(self):
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        self.word_counts: List[int] = []
+        self.ids: Dict[str, int] = {}
+        # Order-insensitive "sorted words" key -> id, for exact matches like "asiimov awp field tested"
+        self.word_sets: Dict[str, int] = {}
+        self.vocabulary: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.trigram_postings: Dict[str, List[int]] = {}
+        # Derived from the lists above on first use, dropped whenever names are added
+        self._prefix_masks: Dict[str, int] = {}
+        self._count_masks: Dict[int, int] = {}
+        self._trigram_arrays: Dict[str, np.ndarray] = {}
+        self._key_lengths = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return name in self.ids
+
+    def add(self, names: Iterable[str]) -> List[str]:
+        """Indexes names not seen yet; returns them"""
+        added = []
+        for name in names:
+            if not name or name in self.ids:
+                continue
+            words = tokens(name)
+            if not words:
+                continue
+            name_id = len(self.names)
+            key = " ".join(words)
+            self.names.append(name)
+            self.keys.append(key)
+            self.word_counts.append(len(words))
+            self.ids[name] = name_id
+            self.word_sets.setdefault(" ".join(sorted(words)), name_id)
+            for word in set(words):
+                posting = self.postings.get(word)
+                if posting is None:
+                    posting = self.postings[word] = []
+                    bisect.insort(self.vocabulary, word)
+                posting.append(name_id)
+            for trigram in trigrams(key):
+                self.trigram_postings.setdefault(trigram, []).append(name_id)
+            added.append(name)
+
+        if added:
+            self._prefix_masks.clear()
+            self._count_masks.clear()
+            self._trigram_arrays.clear()
+            self._key_lengths = None
+        return added
+
+    def _prefix_mask(self, word: str) -> int:
+        """Names having a word that starts with `word`"""
+        mask = self._prefix_masks.get(word)
+        if mask is None:
+            if len(self._prefix_masks) >= PREFIX_CACHE_SIZE:
+                self._prefix_masks.clear()
+            start = bisect.bisect_left(self.vocabulary, word)
+            end = bisect.bisect_left(self.vocabulary, word + "\uffff", start)
+            ids = (name_id for token in self.vocabulary[start:end] for name_id in self.postings[token])
+            mask = self._prefix_masks[word] = _mask(ids, len(self.names))
+        return mask
+
+    def _expand(self, word: str) -> tuple:
+        """Alias -> its words, unless some name really has a word spelled like the alias"""
+        if word in ALIASES and word not in self.postings:
+            return ALIASES[word]
+        return (word,)
+
+    def _word_matches(self, words: List[str]) -> int:
+        """Bitmask of names in which every word is a prefix of some word of the name"""
+        candidates = -1
+        for word in set(words):
+            for expanded in self._expand(word):
+                candidates &= self._prefix_mask(expanded)
+            if not candidates:
+                return 0
+        return candidates
+
+    def _build(self):
+        """Structures shared by every lookup, rebuilt after names are added"""
+        by_count: Dict[int, List[int]] = {}
+        for name_id, count in enumerate(self.word_counts):
+            by_count.setdefault(count, []).append(name_id)
+        self._count_masks = {count: _mask(ids, len(self.names)) for count, ids in sorted(by_count.items())}
+        self._key_lengths = np.fromiter((len(key) + 1 for key in self.keys), dtype=np.float64, count=len(self.keys))
+
+    def _rank(self, candidates: int, limit: int) -> List[int]:
+        """Fewest words first (no StatTrak/Souvenir unless asked), then the shortest name"""
+        if not self._count_masks:
+            self._build()
+        ranked = []
+        for mask in self._count_masks.values():
+            group = candidates & mask
+            if group:
+                # Shortest of a bounded sample: exact within small groups, approximate in huge ones
+                sample = _bits(group, limit * 8)
+                ranked.extend(sorted(sample, key=lambda name_id: len(self.names[name_id]))[:limit])
+                if len(ranked) >= limit:
+                    break
+        return ranked[:limit]
+
+    def _similar(self, key: str, limit: int) -> List[int]:
+        """Best trigram (Jaccard) matches for input that is not a word prefix of anything"""
+        if self._key_lengths is None:
+            self._build()
+        query = trigrams(key)
+        arrays = []
+        for trigram in query:
+            array = self._trigram_arrays.get(trigram)
+            if array is None and trigram in self.trigram_postings:
+                array = self._trigram_arrays[trigram] = np.asarray(self.trigram_postings[trigram], dtype=np.int32)
+            if array is not None:
+                arrays.append(array)
+        if not arrays:
+            return []
+
+        shared = np.bincount(np.concatenate(arrays), minlength=len(self.names)).astype(np.float64)
+        similarity = shared / (len(query) + self._key_lengths - shared)
+        count = min(limit, len(similarity))
+        best = np.argpartition(-similarity, count - 1)[:count]
+        best = sorted(best, key=lambda name_id: (-similarity[name_id], len(self.names[name_id])))
+        return [int(name_id) for name_id in best if similarity[name_id] >= MIN_SIMILARITY]
+
+    def resolve(self, query: str, limit: int = CATALOG_SUGGESTIONS) -> Match:
+        """Canonical name for user input, or up to `limit` suggestions (both empty if nothing is close)"""
+        query = query.strip()
+        if query in self.ids:
+            return Match(query, [])
+        words = tokens(query)
+        if not words or not self.names:
+            return Match(None, [])
+
+        expanded = [part for word in words for part in self._expand(word)]
+        name_id = self.word_sets.get(" ".join(sorted(expanded)))
+        if name_id is not None:
+            return Match(self.names[name_id], [])
+
+        candidates = self._word_matches(words)
+        if candidates and not candidates & (candidates - 1):
+            name = self.names[candidates.bit_length() - 1]
+            # "AK-47 | Redline" must not silently become the one wear the catalog happens to know
+            if WEAR_SUFFIX.search(name) and not WEAR_WORDS.intersection(expanded):
+                return Match(None, [name])
+            return Match(name, [])
+        if candidates:
+            matches = self._rank(candidates, limit)
+        else:
+            matches = self._similar(" ".join(words), limit)
+        return Match(None, [self.names[name_id] for name_id in matches])
+
+    async def load(self):
+        self.add(await db.get_market_items())
+        self._build()
+        print(f"Item catalog loaded: {len(self)} names")
+
+    async def learn(self, names: Iterable[str]):
+        """Adds names confirmed by Steam and persists the new ones"""
+        added = self.add(names)
+        if added:
+            await db.save_market_items(added)
+
+catalog = Catalog()
@@ -1,9 +1,12 @@
 import os
+import socket
 
 BASE_URL = "https://steamcommunity.com/market/priceoverview/"
+INVENTORY_URL = "https://steamcommunity.com/inventory/{}/730/2"
+SEARCH_URL = "https://steamcommunity.com/market/search/render/"
 APP_ID = 730
+# Steam currency id of every request (USD); display currencies are converted locally (fx.py)
 CURRENCY = 1
-UAH_RATE = 42.5
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
@@ -12,4 +15,115 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = int(os.getenv("DB_PORT", 5432))
 DB_NAME = os.getenv("DB_NAME", "steam_skins_db")
 DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASS = os.getenv("DB_PASS", "postgres")
\ No newline at end of file
+DB_PASS = os.getenv("DB_PASS", "postgres")
+
+# Shared HTTP session used for all Steam traffic
+HTTP_CONN_LIMIT = int(os.getenv("HTTP_CONN_LIMIT", 20))
+HTTP_CONN_LIMIT_PER_HOST = int(os.getenv("HTTP_CONN_LIMIT_PER_HOST", 8))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", 20))
+
+# Global Steam request budget shared by the bot and the monitor
+STEAM_REQUESTS_PER_MINUTE = float(os.getenv("STEAM_REQUESTS_PER_MINUTE", 20))
+STEAM_BURST = int(os.getenv("STEAM_BURST", 3))
+STEAM_429_PAUSE = float(os.getenv("STEAM_429_PAUSE", 30))
+# Adaptive (AIMD) budget of each route: +STEAM_AIMD_STEP x max per success, x STEAM_AIMD_DECREASE on 429/5xx
+STEAM_MIN_REQUESTS_PER_MINUTE = float(os.getenv("STEAM_MIN_REQUESTS_PER_MINUTE", 2))
+STEAM_MAX_REQUESTS_PER_MINUTE = float(os.getenv("STEAM_MAX_REQUESTS_PER_MINUTE", 40))
+STEAM_AIMD_STEP = float(os.getenv("STEAM_AIMD_STEP", 0.02))
+STEAM_AIMD_DECREASE = float(os.getenv("STEAM_AIMD_DECREASE", 0.5))
+STEAM_PRICE_RETRIES = int(os.getenv("STEAM_PRICE_RETRIES", 3))
+
+# In-memory price cache in front of SteamClient.get_price
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", 300))
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", 5000))
+PRICE_DB_MAX_AGE = float(os.getenv("PRICE_DB_MAX_AGE", 600))
+
+# Buffered writes of price observations
+PRICE_FLUSH_ROWS = int(os.getenv("PRICE_FLUSH_ROWS", 500))
+PRICE_FLUSH_INTERVAL = float(os.getenv("PRICE_FLUSH_INTERVAL", 5))
+PRICE_BUFFER_LIMIT = int(os.getenv("PRICE_BUFFER_LIMIT", 50000))
+
+# Steam Community Market fee: seller receives price / STEAM_FEE
+STEAM_FEE = float(os.getenv("STEAM_FEE", 1.15))
+
+# /prices compares the portfolio value with its value this many hours ago (hourly history)
+PORTFOLIO_CHANGE_HOURS = float(os.getenv("PORTFOLIO_CHANGE_HOURS", 24))
+
+# Adaptive monitor scheduling (seconds unless noted)
+MONITOR_MIN_INTERVAL = float(os.getenv("MONITOR_MIN_INTERVAL", 60))
+MONITOR_MAX_INTERVAL = float(os.getenv("MONITOR_MAX_INTERVAL", 3600))
+MONITOR_RELOAD_INTERVAL = float(os.getenv("MONITOR_RELOAD_INTERVAL", 3600))
+MONITOR_BATCH_SIZE = int(os.getenv("MONITOR_BATCH_SIZE", 25))
+MONITOR_VOLATILITY_HOURS = float(os.getenv("MONITOR_VOLATILITY_HOURS", 24))
+MONITOR_DEFAULT_VOLATILITY = float(os.getenv("MONITOR_DEFAULT_VOLATILITY", 0.02))
+MONITOR_BULK_PRICING = os.getenv("MONITOR_BULK_PRICING", "1") == "1"
+
+# Postgres LISTEN/NOTIFY channel for alert/watch-list changes
+WATCHLIST_CHANNEL = os.getenv("WATCHLIST_CHANNEL", "watchlist")
+
+# "polling": the bot pulls updates with getUpdates (one process only);
+# "webhook": Telegram posts updates to an aiohttp server (any number of replicas, use MONITOR_MODE=workers)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Public base URL Telegram posts to (empty: the webhook is registered elsewhere)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+# Seconds commands still running at shutdown get to finish before the DB pool and sessions close
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", 20))
+
+# "embedded": the bot runs the monitor itself; "workers": run `python worker.py` (any number of them)
+MONITOR_MODE = os.getenv("MONITOR_MODE", "embedded")
+MONITOR_LEASE_SECONDS = float(os.getenv("MONITOR_LEASE_SECONDS", 300))
+MONITOR_WORKER_IDLE = float(os.getenv("MONITOR_WORKER_IDLE", 5))
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+
+# Egress of this process' Steam traffic (e.g. one per worker)
+STEAM_PROXY = os.getenv("STEAM_PROXY") or None
+STEAM_SOURCE_ADDRESS = os.getenv("STEAM_SOURCE_ADDRESS") or None
+# Pool of egress routes, e.g. "direct#20,source:10.0.0.2,http://proxy:3128#30" (see egress.py);
+# overrides STEAM_PROXY / STEAM_SOURCE_ADDRESS
+STEAM_ROUTES = os.getenv("STEAM_ROUTES", "")
+ROUTE_MAX_ERRORS = int(os.getenv("ROUTE_MAX_ERRORS", 3))
+ROUTE_ERROR_QUARANTINE = float(os.getenv("ROUTE_ERROR_QUARANTINE", 60))
+ROUTE_MAX_QUARANTINE = float(os.getenv("ROUTE_MAX_QUARANTINE", 900))
+
+# /check inventory valuation pipeline
+VALUATION_WORKERS = int(os.getenv("VALUATION_WORKERS", 4))
+VALUATION_PROGRESS_INTERVAL = float(os.getenv("VALUATION_PROGRESS_INTERVAL", 3))
+VALUATION_PRICE_MAX_AGE = float(os.getenv("VALUATION_PRICE_MAX_AGE", 3600))
+VALUATION_CHECKPOINT_ROWS = int(os.getenv("VALUATION_CHECKPOINT_ROWS", 20))
+
+# Local market_hash_name catalog used to resolve /find, /add and /alert input
+CATALOG_SUGGESTIONS = int(os.getenv("CATALOG_SUGGESTIONS", 5))
+
+# Inventory scans
+INVENTORY_PAGE_SIZE = int(os.getenv("INVENTORY_PAGE_SIZE", 100))
+INVENTORY_SNAPSHOT_TTL = float(os.getenv("INVENTORY_SNAPSHOT_TTL", 900))
+
+# Bulk pricing through the paged market search listing
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", 100))
+BULK_FULL_SWEEP_GROUPS = int(os.getenv("BULK_FULL_SWEEP_GROUPS", 300))
+BULK_MAX_PAGES = int(os.getenv("BULK_MAX_PAGES", 400))
+
+# Outbound Telegram notifications
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", 4))
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", 25))
+NOTIFY_CHAT_INTERVAL = float(os.getenv("NOTIFY_CHAT_INTERVAL", 1.1))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", 5))
+NOTIFY_ALERTS_PER_MESSAGE = int(os.getenv("NOTIFY_ALERTS_PER_MESSAGE", 20))
+
+# Prometheus metrics endpoint (port 0 disables it). Local only unless METRICS_HOST says otherwise;
+# workers are opt-in with their own port, since several of them may share a host
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))
+
+# Exchange rates for display currencies (see fx.rate_source for the formats)
+FX_SOURCE = os.getenv("FX_SOURCE", "https://open.er-api.com/v6/latest/USD")
+FX_REFRESH_INTERVAL = float(os.getenv("FX_REFRESH_INTERVAL", 6 * 3600))
+DEFAULT_DISPLAY_CURRENCY = os.getenv("DEFAULT_DISPLAY_CURRENCY", "USD").upper()
@@ -1,9 +1,164 @@
+import asyncio
+import json
+import time
 import asyncpg
-from config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from contextlib import asynccontextmanager
+from config import (
+    DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER,
+    PRICE_FLUSH_ROWS, PRICE_FLUSH_INTERVAL, PRICE_BUFFER_LIMIT, WATCHLIST_CHANNEL
+)
+import metrics
+
+# Rollup table suffix -> date_trunc() unit
+ROLLUP_PERIODS = {"hourly": "hour", "daily": "day"}
+
+# Appends the users RETURNING from an `updated` CTE to their hourly portfolio value series
+RECORD_PORTFOLIO_HISTORY = """
+    INSERT INTO portfolio_value_history AS h (user_id, bucket, market_value, buy_cost, low, high)
+    SELECT user_id, date_trunc('hour', CURRENT_TIMESTAMP::timestamp), market_value, buy_cost, market_value, market_value
+    FROM updated
+    ON CONFLICT (user_id, bucket) DO UPDATE SET
+        market_value = EXCLUDED.market_value,
+        buy_cost = EXCLUDED.buy_cost,
+        low = LEAST(h.low, EXCLUDED.low),
+        high = GREATEST(h.high, EXCLUDED.high)
+"""
+
+class PriceWriter:
+    """Buffers price observations in memory and writes them to skin_prices in batches (COPY)"""
+    UPSERT_LATEST = """
+        INSERT INTO latest_prices (skin_name, price, recorded_at)
+        SELECT DISTINCT ON (skin_name) skin_name, price, CURRENT_TIMESTAMP
+        FROM unnest($1::text[], $2::double precision[]) WITH ORDINALITY AS r(skin_name, price, n)
+        ORDER BY skin_name, n DESC
+        ON CONFLICT (skin_name) DO UPDATE
+        SET price = EXCLUDED.price, recorded_at = EXCLUDED.recorded_at
+    """
+    # Folds a batch into the OHLC bucket of its transaction time; first_at/last_at keep
+    # open/close right when batches of concurrent writers commit out of order. Rows are locked
+    # in skin_name order (like UPSERT_LATEST), so writers with overlapping batches cannot deadlock
+    UPSERT_ROLLUP = """
+        INSERT INTO price_rollups_{period} AS r
+            (skin_name, bucket, open, high, low, close, total, samples, first_at, last_at)
+        SELECT skin_name, date_trunc('{unit}', CURRENT_TIMESTAMP::timestamp),
+               (array_agg(price ORDER BY n))[1], MAX(price), MIN(price), (array_agg(price ORDER BY n DESC))[1],
+               SUM(price), COUNT(*), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM unnest($1::text[], $2::double precision[]) WITH ORDINALITY AS b(skin_name, price, n)
+        GROUP BY skin_name
+        ORDER BY skin_name
+        ON CONFLICT (skin_name, bucket) DO UPDATE SET
+            open = CASE WHEN EXCLUDED.first_at < r.first_at THEN EXCLUDED.open ELSE r.open END,
+            high = GREATEST(r.high, EXCLUDED.high),
+            low = LEAST(r.low, EXCLUDED.low),
+            close = CASE WHEN EXCLUDED.last_at >= r.last_at THEN EXCLUDED.close ELSE r.close END,
+            total = r.total + EXCLUDED.total,
+            samples = r.samples + EXCLUDED.samples,
+            first_at = LEAST(r.first_at, EXCLUDED.first_at),
+            last_at = GREATEST(r.last_at, EXCLUDED.last_at)
+    """
+
+    # Moves every holding of a repriced skin to its new price and returns the per-user
+    # change of the portfolio totals. Holdings are locked in id order, and a holding's
+    # valued_price is read under that lock, so concurrent writers never apply a delta twice.
+    REVALUE_HOLDINGS = """
+        WITH batch AS (
+            SELECT DISTINCT ON (skin_name) skin_name, price
+            FROM unnest($1::text[], $2::double precision[]) WITH ORDINALITY AS r(skin_name, price, n)
+            ORDER BY skin_name, n DESC
+        ), holdings AS (
+            SELECT t.id, t.user_id, t.quantity, t.buy_price, t.valued_price AS old_price, b.price AS new_price
+            FROM tracked_items t JOIN batch b ON b.skin_name = t.skin_name
+            WHERE t.valued_price IS DISTINCT FROM b.price
+            ORDER BY t.id
+            FOR UPDATE OF t
+        ), revalued AS (
+            UPDATE tracked_items t SET valued_price = h.new_price FROM holdings h WHERE t.id = h.id
+        )
+        SELECT user_id,
+               SUM((new_price - COALESCE(old_price, 0)) * quantity) AS value_delta,
+               COALESCE(SUM(buy_price * quantity) FILTER (WHERE old_price IS NULL), 0) AS cost_delta
+        FROM holdings
+        GROUP BY user_id
+        ORDER BY user_id
+    """
+    # Applied in user_id order, so writers with overlapping users cannot deadlock
+    APPLY_PORTFOLIO_DELTAS = """
+        WITH updated AS (
+            INSERT INTO portfolio_values AS p (user_id, market_value, buy_cost, updated_at)
+            SELECT user_id, value_delta, cost_delta, CURRENT_TIMESTAMP
+            FROM unnest($1::bigint[], $2::double precision[], $3::double precision[]) AS d(user_id, value_delta, cost_delta)
+            ORDER BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                market_value = p.market_value + EXCLUDED.market_value,
+                buy_cost = p.buy_cost + EXCLUDED.buy_cost,
+                updated_at = EXCLUDED.updated_at
+            RETURNING user_id, market_value, buy_cost
+        )
+    """ + RECORD_PORTFOLIO_HISTORY
+
+    def __init__(self, database, max_rows: int = PRICE_FLUSH_ROWS, interval: float = PRICE_FLUSH_INTERVAL):
+        self.db = database
+        self.max_rows = max_rows
+        self.interval = interval
+        self.buffer = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_task = None
+
+    def add(self, skin_name: str, price: float, median_price: float = None, volume: int = None):
+        self.buffer.append((skin_name, price, median_price, volume))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        # One threshold flush at a time, referenced so it cannot be collected while pending
+        if len(self.buffer) >= self.max_rows and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.buffer:
+                return
+            rows, self.buffer = self.buffer, []
+
+            if not self.db.pool:
+                await self.db.connect()
+            try:
+                async with self.db.acquire("flush_prices") as connection:
+                    async with connection.transaction():
+                        await connection.copy_records_to_table(
+                            "skin_prices", records=rows, columns=["skin_name", "price", "median_price", "volume"]
+                        )
+                        columns = list(map(list, zip(*rows)))[:2]
+                        await connection.execute(self.UPSERT_LATEST, *columns)
+                        for period, unit in ROLLUP_PERIODS.items():
+                            await connection.execute(self.UPSERT_ROLLUP.format(period=period, unit=unit), *columns)
+                        deltas = await connection.fetch(self.REVALUE_HOLDINGS, *columns)
+                        if deltas:
+                            await connection.execute(self.APPLY_PORTFOLIO_DELTAS, *map(list, zip(*deltas)))
+            except Exception as e:
+                print(f"Database write error ({len(rows)} prices): {e}")
+                if len(rows) + len(self.buffer) <= PRICE_BUFFER_LIMIT:
+                    self.buffer = rows + self.buffer
+
+    async def stop(self):
+        if self._task:
+            # A running flush owns the rows it took from the buffer: cancel only between flushes
+            async with self._lock:
+                self._task.cancel()
+                self._task = None
+        if self._flush_task:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
 
 class Database():
     def __init__(self):
         self.pool = None
+        self.price_writer = PriceWriter(self)
         
     async def connect(self):
         if not self.pool:
@@ -20,16 +175,67 @@ class Database():
             except Exception as e:
                 print(f"Connection error: {e}")
             
-    async def add_price(self, skin_name: str, price: float):
-        if not self.pool:
-            await self.connect()
+    @asynccontextmanager
+    async def acquire(self, method: str):
+        """pool.acquire() that records pool wait time and connection hold time per Database method"""
+        requested = time.perf_counter()
+        async with self.pool.acquire() as connection:
+            acquired = time.perf_counter()
+            metrics.db_pool_wait_seconds.observe(acquired - requested, method=method)
+            try:
+                yield connection
+            finally:
+                metrics.db_query_seconds.observe(time.perf_counter() - acquired, method=method)
 
-        query = "INSERT INTO skin_prices (skin_name, price) VALUES ($1, $2)"
-        try:
-            async with self.pool.acquire() as connection:
-                await connection.execute(query, skin_name, price)
-        except Exception as e:
-            print(f"Database write error: {e}")
+    async def publish(self, connection, op: str, user_id: int, skin_name: str, target_price: float = None):
+        """Announces a watch-list change on WATCHLIST_CHANNEL (delivered when the transaction commits)"""
+        payload = json.dumps({"op": op, "user_id": user_id, "skin_name": skin_name, "target_price": target_price})
+        await connection.execute("SELECT pg_notify($1, $2)", WATCHLIST_CHANNEL, payload)
+
+    async def revalue_portfolio(self, connection, user_id: int):
+        """Recomputes the user's portfolio_values row after their holdings changed (same transaction).
+        New holdings are valued at the latest stored price; the row is locked before summing,
+        so a concurrent price delta is either already in the sum or applied after it."""
+        await connection.execute("""
+            UPDATE tracked_items t SET valued_price = l.price
+            FROM latest_prices l
+            WHERE t.user_id = $1 AND t.valued_price IS NULL AND l.skin_name = t.skin_name
+        """, user_id)
+        await connection.execute("""
+            INSERT INTO portfolio_values (user_id) VALUES ($1)
+            ON CONFLICT (user_id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+        """, user_id)
+        await connection.execute("""
+            WITH updated AS (
+                UPDATE portfolio_values p
+                SET market_value = totals.market_value, buy_cost = totals.buy_cost, updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT COALESCE(SUM(valued_price * quantity), 0) AS market_value,
+                           COALESCE(SUM(buy_price * quantity) FILTER (WHERE valued_price IS NOT NULL), 0) AS buy_cost
+                    FROM tracked_items WHERE user_id = $1
+                ) totals
+                WHERE p.user_id = $1
+                RETURNING p.user_id, p.market_value, p.buy_cost
+            )
+        """ + RECORD_PORTFOLIO_HISTORY, user_id)
+
+    async def listen(self, callback, channel: str = WATCHLIST_CHANNEL):
+        """Subscribes callback(payload: dict) to watch-list changes; returns the dedicated connection"""
+        def on_notify(connection, pid, channel, payload):
+            try:
+                callback(json.loads(payload))
+            except Exception as e:
+                print(f"Bad notification on {channel}: {e}")
+
+        connection = await asyncpg.connect(
+            user=DB_USER, password=DB_PASS, database=DB_NAME, host=DB_HOST, port=DB_PORT
+        )
+        await connection.add_listener(channel, on_notify)
+        return connection
+
+    async def add_price(self, skin_name: str, price: float, median_price: float = None, volume: int = None):
+        """Queues the observation; PriceWriter flushes it on a size or time threshold"""
+        self.price_writer.add(skin_name, price, median_price, volume)
             
     async def create_tables(self):
         """Creates tables and updates the structure if necessary"""
@@ -56,6 +262,147 @@ class Database():
         );
         """
 
+        query_latest = """
+        CREATE TABLE IF NOT EXISTS latest_prices (
+            skin_name TEXT PRIMARY KEY,
+            price DOUBLE PRECISION NOT NULL,
+            currency TEXT DEFAULT 'USD',
+            recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_skin_prices_name_time ON skin_prices (skin_name, recorded_at DESC);
+        """
+
+        query_backfill = """
+        INSERT INTO latest_prices (skin_name, price, currency, recorded_at)
+        SELECT DISTINCT ON (skin_name) skin_name, price, currency, recorded_at
+        FROM skin_prices
+        WHERE NOT EXISTS (SELECT 1 FROM latest_prices)
+        ORDER BY skin_name, recorded_at DESC, id DESC
+        ON CONFLICT (skin_name) DO NOTHING
+        """
+
+        query_checkpoints = """
+        CREATE TABLE IF NOT EXISTS valuation_checkpoints (
+            steam_id TEXT NOT NULL,
+            skin_name TEXT NOT NULL,
+            price DOUBLE PRECISION NOT NULL,
+            checked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (steam_id, skin_name)
+        );
+        """
+
+        query_inventory = """
+        CREATE TABLE IF NOT EXISTS item_descriptions (
+            classid TEXT NOT NULL,
+            instanceid TEXT NOT NULL,
+            market_hash_name TEXT,
+            PRIMARY KEY (classid, instanceid)
+        );
+        CREATE TABLE IF NOT EXISTS inventory_snapshots (
+            steam_id TEXT PRIMARY KEY,
+            items JSONB NOT NULL,
+            fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        -- Only marketable descriptions are cached: a non-marketable one may become marketable later
+        DELETE FROM item_descriptions WHERE market_hash_name IS NULL;
+        """
+
+        query_jobs = """
+        CREATE TABLE IF NOT EXISTS monitor_jobs (
+            skin_name TEXT PRIMARY KEY,
+            next_run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            leased_by TEXT,
+            lease_until TIMESTAMP,
+            last_price DOUBLE PRECISION,
+            checked_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_monitor_jobs_next_run ON monitor_jobs (next_run_at);
+        """
+
+        query_rollups = "".join(f"""
+        CREATE TABLE IF NOT EXISTS price_rollups_{period} (
+            skin_name TEXT NOT NULL,
+            bucket TIMESTAMP NOT NULL,
+            open DOUBLE PRECISION NOT NULL,
+            high DOUBLE PRECISION NOT NULL,
+            low DOUBLE PRECISION NOT NULL,
+            close DOUBLE PRECISION NOT NULL,
+            total DOUBLE PRECISION NOT NULL,
+            samples INTEGER NOT NULL,
+            first_at TIMESTAMP NOT NULL,
+            last_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (skin_name, bucket)
+        );
+        INSERT INTO price_rollups_{period} (skin_name, bucket, open, high, low, close, total, samples, first_at, last_at)
+        SELECT skin_name, date_trunc('{unit}', recorded_at) AS bucket,
+               (array_agg(price ORDER BY recorded_at, id))[1], MAX(price), MIN(price),
+               (array_agg(price ORDER BY recorded_at DESC, id DESC))[1],
+               SUM(price), COUNT(*), MIN(recorded_at), MAX(recorded_at)
+        FROM skin_prices
+        WHERE recorded_at IS NOT NULL AND NOT EXISTS (SELECT 1 FROM price_rollups_{period})
+        GROUP BY skin_name, bucket
+        ON CONFLICT DO NOTHING;
+        """ for period, unit in ROLLUP_PERIODS.items())
+
+        query_catalog = """
+        CREATE TABLE IF NOT EXISTS market_items (
+            market_hash_name TEXT PRIMARY KEY,
+            first_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+
+        # Seeds a new catalog with every name the bot has already seen
+        query_catalog_backfill = """
+        INSERT INTO market_items (market_hash_name)
+        SELECT skin_name FROM latest_prices
+        UNION SELECT market_hash_name FROM item_descriptions WHERE market_hash_name IS NOT NULL
+        ON CONFLICT DO NOTHING;
+        """
+
+        # Running totals kept up to date by PriceWriter (per-skin deltas) and revalue_portfolio()
+        query_portfolio = """
+        CREATE INDEX IF NOT EXISTS idx_tracked_items_skin ON tracked_items (skin_name);
+        CREATE TABLE IF NOT EXISTS portfolio_values (
+            user_id BIGINT PRIMARY KEY,
+            market_value DOUBLE PRECISION NOT NULL DEFAULT 0,
+            buy_cost DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS portfolio_value_history (
+            user_id BIGINT NOT NULL,
+            bucket TIMESTAMP NOT NULL,
+            market_value DOUBLE PRECISION NOT NULL,
+            buy_cost DOUBLE PRECISION NOT NULL,
+            low DOUBLE PRECISION NOT NULL,
+            high DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (user_id, bucket)
+        );
+        """
+
+        query_portfolio_backfill = """
+        UPDATE tracked_items t SET valued_price = l.price
+        FROM latest_prices l
+        WHERE l.skin_name = t.skin_name AND t.valued_price IS NULL;
+        INSERT INTO portfolio_values (user_id, market_value, buy_cost)
+        SELECT user_id, COALESCE(SUM(valued_price * quantity), 0),
+               COALESCE(SUM(buy_price * quantity) FILTER (WHERE valued_price IS NOT NULL), 0)
+        FROM tracked_items
+        GROUP BY user_id
+        ON CONFLICT DO NOTHING;
+        """
+
+        query_settings = """
+        CREATE TABLE IF NOT EXISTS fx_rates (
+            currency TEXT PRIMARY KEY,
+            rate DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id BIGINT PRIMARY KEY,
+            currency TEXT NOT NULL
+        );
+        """
+
         query_alter = """
         DO $$ 
         BEGIN 
@@ -64,14 +411,43 @@ class Database():
             EXCEPTION
                 WHEN duplicate_column THEN RAISE NOTICE 'column target_price already exists in tracked_items.';
             END;
+            BEGIN
+                ALTER TABLE tracked_items ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1;
+            EXCEPTION
+                WHEN duplicate_column THEN RAISE NOTICE 'column quantity already exists in tracked_items.';
+            END;
+            BEGIN
+                ALTER TABLE tracked_items ADD COLUMN valued_price DOUBLE PRECISION;
+            EXCEPTION
+                WHEN duplicate_column THEN RAISE NOTICE 'column valued_price already exists in tracked_items.';
+            END;
+            BEGIN
+                ALTER TABLE skin_prices ADD COLUMN median_price DOUBLE PRECISION;
+                ALTER TABLE skin_prices ADD COLUMN volume INTEGER;
+            EXCEPTION
+                WHEN duplicate_column THEN RAISE NOTICE 'columns median_price/volume already exist in skin_prices.';
+            END;
         END $$;
         """
         
         try:
-            async with self.pool.acquire() as connection:
+            async with self.acquire("create_tables") as connection:
                 await connection.execute(query_prices)
                 await connection.execute(query_items)
                 await connection.execute(query_alter)
+                await connection.execute(query_latest)
+                await connection.execute(query_backfill)
+                await connection.execute(query_checkpoints)
+                await connection.execute(query_inventory)
+                await connection.execute(query_jobs)
+                await connection.execute(query_rollups)
+                await connection.execute(query_settings)
+                await connection.execute(query_catalog)
+                if not await connection.fetchval("SELECT EXISTS (SELECT 1 FROM market_items)"):
+                    await connection.execute(query_catalog_backfill)
+                await connection.execute(query_portfolio)
+                if not await connection.fetchval("SELECT EXISTS (SELECT 1 FROM portfolio_values)"):
+                    await connection.execute(query_portfolio_backfill)
                 print("Tables checked/updated successfully")
         except Exception as e:
             print(f"Error creating tables: {e}")
@@ -80,19 +456,230 @@ class Database():
         if not self.pool:
             await self.connect()
 
+        query = "SELECT skin_name, price, currency, recorded_at FROM latest_prices"
+        try:
+            async with self.acquire("get_latest_price") as connection:
+                rows = await connection.fetch(query)
+                return rows
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return []
+
+    async def get_latest_prices(self, skin_names, max_age: float = None):
+        """Latest price rows only for the requested skins (optionally only those younger than max_age seconds)"""
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            SELECT skin_name, price, currency, recorded_at
+            FROM latest_prices
+            WHERE skin_name = ANY($1::text[])
+              AND ($2::double precision IS NULL OR recorded_at > CURRENT_TIMESTAMP - make_interval(secs => $2))
+        """
+        try:
+            async with self.acquire("get_latest_prices") as connection:
+                return await connection.fetch(query, list(skin_names), max_age)
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return []
+
+    async def get_fresh_price(self, skin_name: str, max_age: float):
+        """Returns the newest stored price if it is younger than max_age seconds"""
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            SELECT price FROM latest_prices
+            WHERE skin_name = $1 AND recorded_at > CURRENT_TIMESTAMP - make_interval(secs => $2)
+        """
+        try:
+            async with self.acquire("get_fresh_price") as connection:
+                return await connection.fetchval(query, skin_name, float(max_age))
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return None
+
+    async def get_price_volatility(self, skin_names, hours: float):
+        """Relative standard deviation (stddev / avg) of each skin's prices over the last `hours`"""
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            SELECT skin_name, stddev_samp(price) / NULLIF(avg(price), 0) AS volatility
+            FROM skin_prices
+            WHERE skin_name = ANY($1::text[]) AND recorded_at > CURRENT_TIMESTAMP - make_interval(secs => $2 * 3600)
+            GROUP BY skin_name
+        """
+        try:
+            async with self.acquire("get_price_volatility") as connection:
+                rows = await connection.fetch(query, list(skin_names), float(hours))
+                return {row['skin_name']: row['volatility'] for row in rows if row['volatility'] is not None}
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return {}
+
+    async def get_price_rollups(self, skin_name: str, period: str, max_age: float = None):
+        """OHLC buckets of one skin as column lists ordered by time (epoch seconds in "buckets"),
+        plus "now" on the same clock. Returns None if there are none."""
+        if not self.pool:
+            await self.connect()
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+
+        query = f"""
+            SELECT array_agg(EXTRACT(EPOCH FROM bucket)::double precision ORDER BY bucket) AS buckets,
+                   array_agg(open ORDER BY bucket) AS open,
+                   array_agg(high ORDER BY bucket) AS high,
+                   array_agg(low ORDER BY bucket) AS low,
+                   array_agg(close ORDER BY bucket) AS close,
+                   array_agg(total ORDER BY bucket) AS total,
+                   array_agg(samples ORDER BY bucket) AS samples,
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP::timestamp)::double precision AS now
+            FROM price_rollups_{period}
+            WHERE skin_name = $1
+              AND ($2::double precision IS NULL OR bucket >= CURRENT_TIMESTAMP::timestamp - $2 * INTERVAL '1 second')
+        """
+        try:
+            async with self.acquire("get_price_rollups") as connection:
+                row = await connection.fetchrow(query, skin_name, max_age)
+                return dict(row) if row and row['buckets'] else None
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return None
+
+    async def get_valuation_checkpoint(self, steam_id: str, max_age: float):
+        """Prices already found by a recent /check of this profile"""
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            SELECT skin_name, price FROM valuation_checkpoints
+            WHERE steam_id = $1 AND checked_at > CURRENT_TIMESTAMP - make_interval(secs => $2)
+        """
+        try:
+            async with self.acquire("get_valuation_checkpoint") as connection:
+                rows = await connection.fetch(query, steam_id, float(max_age))
+                return {row['skin_name']: row['price'] for row in rows}
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return {}
+
+    async def save_valuation_checkpoint(self, steam_id: str, prices):
+        """Upserts [(skin_name, price)] found while valuing a profile"""
+        if not prices:
+            return
+        if not self.pool:
+            await self.connect()
+
         query = """
-            SELECT DISTINCT ON (skin_name) skin_name, price, currency, recorded_at 
-            FROM skin_prices 
-            ORDER BY skin_name, recorded_at DESC
+            INSERT INTO valuation_checkpoints (steam_id, skin_name, price)
+            SELECT $1, skin_name, price FROM unnest($2::text[], $3::double precision[]) AS r(skin_name, price)
+            ON CONFLICT (steam_id, skin_name) DO UPDATE
+            SET price = EXCLUDED.price, checked_at = CURRENT_TIMESTAMP
         """
+        skin_names, values = zip(*prices)
         try:
-            async with self.pool.acquire() as connection:
+            async with self.acquire("save_valuation_checkpoint") as connection:
+                await connection.execute(query, steam_id, list(skin_names), list(values))
+        except Exception as e:
+            print(f"Database write error: {e}")
+
+    async def get_item_descriptions(self):
+        """Returns the persistent {(classid, instanceid): market_hash_name} cache of marketable items"""
+        if not self.pool:
+            await self.connect()
+
+        query = "SELECT classid, instanceid, market_hash_name FROM item_descriptions"
+        try:
+            async with self.acquire("get_item_descriptions") as connection:
                 rows = await connection.fetch(query)
-                return rows
+                return {(row['classid'], row['instanceid']): row['market_hash_name'] for row in rows}
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return {}
+
+    async def save_item_descriptions(self, descriptions: dict):
+        if not descriptions:
+            return
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO item_descriptions (classid, instanceid, market_hash_name)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::text[])
+            ON CONFLICT (classid, instanceid) DO NOTHING
+        """
+        keys = list(descriptions)
+        try:
+            async with self.acquire("save_item_descriptions") as connection:
+                await connection.execute(
+                    query,
+                    [classid for classid, _ in keys],
+                    [instanceid for _, instanceid in keys],
+                    [descriptions[key] for key in keys]
+                )
+        except Exception as e:
+            print(f"Database write error: {e}")
+
+    async def get_market_items(self):
+        """Every market_hash_name of the local catalog"""
+        if not self.pool:
+            await self.connect()
+
+        query = "SELECT market_hash_name FROM market_items"
+        try:
+            async with self.acquire("get_market_items") as connection:
+                return [row['market_hash_name'] for row in await connection.fetch(query)]
         except Exception as e:
             print(f"Database read error: {e}")
             return []
 
+    async def save_market_items(self, names):
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO market_items (market_hash_name)
+            SELECT * FROM unnest($1::text[])
+            ON CONFLICT (market_hash_name) DO NOTHING
+        """
+        try:
+            async with self.acquire("save_market_items") as connection:
+                await connection.execute(query, list(names))
+        except Exception as e:
+            print(f"Database write error: {e}")
+
+    async def get_inventory_snapshot(self, steam_id: str, max_age: float):
+        """Returns {market_hash_name: count} stored less than max_age seconds ago, or None"""
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            SELECT items FROM inventory_snapshots
+            WHERE steam_id = $1 AND fetched_at > CURRENT_TIMESTAMP - make_interval(secs => $2)
+        """
+        try:
+            async with self.acquire("get_inventory_snapshot") as connection:
+                items = await connection.fetchval(query, steam_id, float(max_age))
+                return json.loads(items) if items is not None else None
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return None
+
+    async def save_inventory_snapshot(self, steam_id: str, items: dict):
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO inventory_snapshots (steam_id, items) VALUES ($1, $2::jsonb)
+            ON CONFLICT (steam_id) DO UPDATE SET items = EXCLUDED.items, fetched_at = CURRENT_TIMESTAMP
+        """
+        try:
+            async with self.acquire("save_inventory_snapshot") as connection:
+                await connection.execute(query, steam_id, json.dumps(items))
+        except Exception as e:
+            print(f"Database write error: {e}")
+
     async def add_track_skin(self, user_id: int, skin_name: str, buy_price: float = None):
         if not self.pool:
             await self.connect()
@@ -104,13 +691,42 @@ class Database():
             DO UPDATE SET buy_price = COALESCE($3, tracked_items.buy_price)
         """
         try:
-            async with self.pool.acquire() as connection:
-                await connection.execute(query, user_id, skin_name, buy_price)
+            async with self.acquire("add_track_skin") as connection:
+                async with connection.transaction():
+                    await connection.execute(query, user_id, skin_name, buy_price)
+                    await self.revalue_portfolio(connection, user_id)
+                    await self.publish(connection, "track", user_id, skin_name)
                 return True
         except Exception as e:
             print(f"Error adding skin: {e}")
             return False
 
+    async def import_track_skins(self, user_id: int, items: dict):
+        """Upserts {skin_name: quantity} into the user's portfolio in one statement.
+        Existing rows keep their buy/target price and take the new quantity.
+        Returns (added, updated)."""
+        if not items:
+            return 0, 0
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO tracked_items (user_id, skin_name, quantity)
+            SELECT $1, skin_name, quantity FROM unnest($2::text[], $3::int[]) AS r(skin_name, quantity)
+            ON CONFLICT (user_id, skin_name) DO UPDATE SET quantity = EXCLUDED.quantity
+            RETURNING (xmax = 0) AS inserted
+        """
+        try:
+            async with self.acquire("import_track_skins") as connection:
+                async with connection.transaction():
+                    rows = await connection.fetch(query, user_id, list(items), [int(count) for count in items.values()])
+                    await self.revalue_portfolio(connection, user_id)
+                added = sum(1 for row in rows if row['inserted'])
+                return added, len(rows) - added
+        except Exception as e:
+            print(f"Error importing skins: {e}")
+            return None
+
     async def set_alert_price(self, user_id, skin_name, target_price):
         """Sets the price for notification"""
         if not self.pool: await self.connect()
@@ -119,9 +735,17 @@ class Database():
         SET target_price = $3 
         WHERE user_id = $1 AND skin_name = $2
         """
+        query_job = """
+        INSERT INTO monitor_jobs (skin_name) VALUES ($1)
+        ON CONFLICT (skin_name) DO UPDATE SET next_run_at = LEAST(monitor_jobs.next_run_at, CURRENT_TIMESTAMP)
+        """
         try:
-            async with self.pool.acquire() as connection:
-                result = await connection.execute(query, user_id, skin_name, float(target_price))
+            async with self.acquire("set_alert_price") as connection:
+                async with connection.transaction():
+                    result = await connection.execute(query, user_id, skin_name, float(target_price))
+                    if result != "UPDATE 0":
+                        await connection.execute(query_job, skin_name)
+                        await self.publish(connection, "alert", user_id, skin_name, float(target_price))
                 return "UPDATE" in result
         except Exception as e:
             print(f"Error setting alert: {e}")
@@ -131,15 +755,174 @@ class Database():
         """Returns all active notifications (where target_price is not empty)"""
         if not self.pool: await self.connect()
         query = "SELECT user_id, skin_name, target_price FROM tracked_items WHERE target_price IS NOT NULL"
-        async with self.pool.acquire() as connection:
+        async with self.acquire("get_all_alerts") as connection:
             return await connection.fetch(query)
 
+    async def get_alerts_for(self, skin_names):
+        """Active notifications only for the given skins"""
+        if not self.pool: await self.connect()
+        query = """
+        SELECT user_id, skin_name, target_price FROM tracked_items
+        WHERE target_price IS NOT NULL AND skin_name = ANY($1::text[])
+        """
+        async with self.acquire("get_alerts_for") as connection:
+            return await connection.fetch(query, list(skin_names))
+
+    async def sync_monitor_jobs(self):
+        """Makes monitor_jobs contain exactly the skins that have at least one alert"""
+        if not self.pool: await self.connect()
+        query_add = """
+        INSERT INTO monitor_jobs (skin_name)
+        SELECT DISTINCT skin_name FROM tracked_items WHERE target_price IS NOT NULL
+        ON CONFLICT (skin_name) DO NOTHING
+        """
+        query_drop = """
+        DELETE FROM monitor_jobs j
+        WHERE NOT EXISTS (
+            SELECT 1 FROM tracked_items t WHERE t.skin_name = j.skin_name AND t.target_price IS NOT NULL
+        )
+        """
+        async with self.acquire("sync_monitor_jobs") as connection:
+            async with connection.transaction():
+                await connection.execute(query_add)
+                await connection.execute(query_drop)
+
+    async def claim_monitor_jobs(self, worker_id: str, limit: int, lease_seconds: float):
+        """Leases up to `limit` due skins to this worker; rows locked by other workers are skipped"""
+        if not self.pool: await self.connect()
+        query = """
+        UPDATE monitor_jobs j
+        SET leased_by = $1, lease_until = CURRENT_TIMESTAMP + make_interval(secs => $3)
+        FROM (
+            SELECT skin_name FROM monitor_jobs
+            WHERE next_run_at <= CURRENT_TIMESTAMP
+              AND (lease_until IS NULL OR lease_until < CURRENT_TIMESTAMP)
+            ORDER BY next_run_at
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ) due
+        WHERE j.skin_name = due.skin_name
+        RETURNING j.skin_name
+        """
+        async with self.acquire("claim_monitor_jobs") as connection:
+            rows = await connection.fetch(query, worker_id, limit, float(lease_seconds))
+            return [row['skin_name'] for row in rows]
+
+    async def complete_monitor_jobs(self, worker_id: str, results):
+        """Releases leased skins: results are (skin_name, price or None, seconds until the next run).
+        Jobs of skins that no longer have any alert are deleted."""
+        if not results:
+            return
+        if not self.pool: await self.connect()
+        query = """
+        UPDATE monitor_jobs j
+        SET next_run_at = CURRENT_TIMESTAMP + make_interval(secs => r.delay),
+            last_price = COALESCE(r.price, j.last_price),
+            checked_at = CURRENT_TIMESTAMP,
+            leased_by = NULL,
+            lease_until = NULL
+        FROM unnest($2::text[], $3::double precision[], $4::double precision[]) AS r(skin_name, price, delay)
+        WHERE j.skin_name = r.skin_name AND j.leased_by = $1
+        """
+        query_drop = """
+        DELETE FROM monitor_jobs j
+        WHERE j.skin_name = ANY($1::text[])
+          AND NOT EXISTS (
+            SELECT 1 FROM tracked_items t WHERE t.skin_name = j.skin_name AND t.target_price IS NOT NULL
+          )
+        """
+        skin_names, prices, delays = zip(*results)
+        async with self.acquire("complete_monitor_jobs") as connection:
+            async with connection.transaction():
+                await connection.execute(query, worker_id, list(skin_names), list(prices), list(delays))
+                await connection.execute(query_drop, list(skin_names))
+
     async def remove_alert(self, user_id, skin_name):
         """Removes the notification (resets target_price)"""
         if not self.pool: await self.connect()
         query = "UPDATE tracked_items SET target_price = NULL WHERE user_id = $1 AND skin_name = $2"
-        async with self.pool.acquire() as connection:
-            await connection.execute(query, user_id, skin_name)
+        async with self.acquire("remove_alert") as connection:
+            async with connection.transaction():
+                await connection.execute(query, user_id, skin_name)
+                await self.publish(connection, "clear", user_id, skin_name)
+
+    async def remove_alerts(self, alerts):
+        """Resets target_price for many (user_id, skin_name, target_price) rows in one UPDATE.
+        Rows whose target was changed in the meantime are left alone."""
+        if not alerts:
+            return
+        if not self.pool: await self.connect()
+        query = """
+        WITH cleared AS (
+            UPDATE tracked_items t SET target_price = NULL
+            FROM unnest($1::bigint[], $2::text[], $3::double precision[]) AS r(user_id, skin_name, target_price)
+            WHERE t.user_id = r.user_id AND t.skin_name = r.skin_name AND t.target_price = r.target_price
+            RETURNING t.user_id, t.skin_name
+        )
+        SELECT count(pg_notify($4, json_build_object('op', 'clear', 'user_id', user_id, 'skin_name', skin_name)::text))
+        FROM cleared
+        """
+        user_ids, skin_names, targets = zip(*alerts)
+        async with self.acquire("remove_alerts") as connection:
+            await connection.execute(query, list(user_ids), list(skin_names), list(targets), WATCHLIST_CHANNEL)
+
+    async def get_fx_rates(self):
+        """{currency: units per USD} as last saved by the FX refresher"""
+        if not self.pool:
+            await self.connect()
+
+        try:
+            async with self.acquire("get_fx_rates") as connection:
+                rows = await connection.fetch("SELECT currency, rate FROM fx_rates")
+                return {row['currency']: row['rate'] for row in rows}
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return {}
+
+    async def save_fx_rates(self, rates: dict):
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO fx_rates (currency, rate, updated_at)
+            SELECT currency, rate, CURRENT_TIMESTAMP
+            FROM unnest($1::text[], $2::double precision[]) AS r(currency, rate)
+            ON CONFLICT (currency) DO UPDATE
+            SET rate = EXCLUDED.rate, updated_at = EXCLUDED.updated_at
+        """
+        try:
+            async with self.acquire("save_fx_rates") as connection:
+                await connection.execute(query, list(rates.keys()), list(rates.values()))
+        except Exception as e:
+            print(f"Database write error: {e}")
+
+    async def get_user_currency(self, user_id: int):
+        """Display currency chosen with /currency, or None"""
+        if not self.pool:
+            await self.connect()
+
+        try:
+            async with self.acquire("get_user_currency") as connection:
+                return await connection.fetchval("SELECT currency FROM user_settings WHERE user_id = $1", user_id)
+        except Exception as e:
+            print(f"Database read error: {e}")
+            return None
+
+    async def set_user_currency(self, user_id: int, currency: str):
+        if not self.pool:
+            await self.connect()
+
+        query = """
+            INSERT INTO user_settings (user_id, currency) VALUES ($1, $2)
+            ON CONFLICT (user_id) DO UPDATE SET currency = EXCLUDED.currency
+        """
+        try:
+            async with self.acquire("set_user_currency") as connection:
+                await connection.execute(query, user_id, currency)
+                return True
+        except Exception as e:
+            print(f"Database write error: {e}")
+            return False
 
     async def get_user_items(self, user_id: int):
         """Returns skins ONLY for a specific user (updated: added target_price)"""
@@ -148,13 +931,45 @@ class Database():
 
         query = "SELECT skin_name, buy_price, target_price FROM tracked_items WHERE user_id = $1"
         try:
-            async with self.pool.acquire() as connection:
+            async with self.acquire("get_user_items") as connection:
                 rows = await connection.fetch(query, user_id)
                 return rows 
         except Exception as e:
             print(f"Error fetching user items: {e}")
             return []
 
+    async def get_portfolio(self, user_id: int, fee: float, change_hours: float):
+        """The user's holdings at the price their totals were last moved to, plus the
+        maintained totals row (with the value `change_hours` ago) or None"""
+        if not self.pool:
+            await self.connect()
+
+        query_items = """
+            SELECT skin_name, buy_price, target_price, quantity,
+                   valued_price AS market_price,
+                   valued_price / $2 AS net_price,
+                   valued_price - buy_price AS pnl
+            FROM tracked_items
+            WHERE user_id = $1
+            ORDER BY id
+        """
+        query_totals = """
+            SELECT market_value, buy_cost,
+                   (SELECT market_value FROM portfolio_value_history
+                    WHERE user_id = $1 AND bucket <= CURRENT_TIMESTAMP::timestamp - make_interval(secs => $2)
+                    ORDER BY bucket DESC LIMIT 1) AS previous_value
+            FROM portfolio_values
+            WHERE user_id = $1
+        """
+        try:
+            async with self.acquire("get_portfolio") as connection:
+                items = await connection.fetch(query_items, user_id, fee)
+                totals = await connection.fetchrow(query_totals, user_id, change_hours * 3600.0) if items else None
+                return items, totals
+        except Exception as e:
+            print(f"Error fetching portfolio: {e}")
+            return [], None
+
     async def delete_track_skin(self, user_id: int, skin_name: str):
         """Removes the skin for a specific user"""
         if not self.pool:
@@ -162,10 +977,13 @@ class Database():
             
         query = "DELETE FROM tracked_items WHERE user_id = $1 AND skin_name = $2"
         try:
-            async with self.pool.acquire() as connection:
-                result = await connection.execute(query, user_id, skin_name)
-                if "DELETE 0" in result:
-                    return False
+            async with self.acquire("delete_track_skin") as connection:
+                async with connection.transaction():
+                    result = await connection.execute(query, user_id, skin_name)
+                    if "DELETE 0" in result:
+                        return False
+                    await self.revalue_portfolio(connection, user_id)
+                    await self.publish(connection, "untrack", user_id, skin_name)
                 return True
         except Exception as e:
             print(f"Error deleting skin: {e}")
@@ -178,7 +996,7 @@ class Database():
         
         query = "SELECT DISTINCT skin_name FROM tracked_items"
         try:
-            async with self.pool.acquire() as connection:
+            async with self.acquire("get_all_unique_skins") as connection:
                 rows = await connection.fetch(query)
                 return rows 
         except Exception as e:
@@ -186,6 +1004,7 @@ class Database():
             return []
 
     async def close(self):
+        await self.price_writer.stop()
         if self.pool:
             await self.pool.close()
             print("Database connection closed")
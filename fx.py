@@ -0,0 +1,128 @@
+"""Display currencies. Steam is always queried in USD (CURRENCY = 1); amounts are
+converted with a locally refreshed rate table when a message is rendered, so a
+user's display currency costs no extra Steam requests."""
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Optional
+import aiohttp
+from config import FX_SOURCE, FX_REFRESH_INTERVAL, DEFAULT_DISPLAY_CURRENCY
+from database import db
+
+BASE_CURRENCY = "USD"
+SYMBOLS = {
+    "USD": "$", "UAH": "₴", "EUR": "€", "PLN": "zł", "GBP": "£", "CZK": "Kč",
+    "KZT": "₸", "TRY": "₺", "CNY": "¥", "JPY": "¥", "BRL": "R$", "CAD": "C$", "CHF": "CHF"
+}
+
+def _parse_rates(data: dict) -> Dict[str, float]:
+    """Accepts {"rates": {...}} (open.er-api.com, exchangerate.host, ...) or a flat {code: rate}"""
+    rates = data.get("rates", data)
+    parsed = {}
+    for currency, rate in rates.items():
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            continue
+        if rate > 0 and len(currency) == 3:
+            parsed[currency.upper()] = rate
+    parsed[BASE_CURRENCY] = 1.0
+    return parsed
+
+class StaticRateSource:
+    """Fixed rates, e.g. for tests: StaticRateSource({"UAH": 41.5})"""
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+
+    async def fetch(self) -> Dict[str, float]:
+        return _parse_rates(self.rates)
+
+class FileRateSource:
+    """JSON file with rates per USD; re-read on every refresh"""
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def fetch(self) -> Dict[str, float]:
+        return _parse_rates(json.loads(self.path.read_text(encoding="utf-8")))
+
+class HttpRateSource:
+    """JSON endpoint with rates per USD"""
+    def __init__(self, url: str, timeout: float = 15):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def fetch(self) -> Dict[str, float]:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with session.get(self.url) as response:
+                response.raise_for_status()
+                return _parse_rates(await response.json(content_type=None))
+
+def rate_source(spec: str = FX_SOURCE):
+    """"https://...", "file:<path>" or "static:UAH=41.5,EUR=0.92"; None if empty"""
+    if not spec:
+        return None
+    if spec.startswith("file:"):
+        return FileRateSource(spec[len("file:"):])
+    if spec.startswith("static:"):
+        pairs = (item.split("=", 1) for item in spec[len("static:"):].split(",") if "=" in item)
+        return StaticRateSource({currency.strip(): rate for currency, rate in pairs})
+    return HttpRateSource(spec)
+
+class FxTable:
+    """In-memory copy of fx_rates: units of each currency per USD"""
+    def __init__(self):
+        self.rates = {BASE_CURRENCY: 1.0}
+
+    def supports(self, currency: str) -> bool:
+        return currency in self.rates
+
+    def resolve(self, currency: Optional[str]) -> str:
+        """The requested currency if a rate is known, otherwise USD"""
+        return currency if currency in self.rates else BASE_CURRENCY
+
+    def convert(self, usd: float, currency: str) -> float:
+        return usd * self.rates.get(currency, 1.0)
+
+    def to_usd(self, amount: float, currency: str) -> float:
+        return amount / self.rates.get(currency, 1.0)
+
+    def format(self, usd: float, currency: str, digits: int = 2) -> str:
+        """"12.34 $" / "512.10 ₴" (unknown currencies fall back to USD)"""
+        currency = self.resolve(currency)
+        return f"{self.convert(usd, currency):.{digits}f} {SYMBOLS.get(currency, currency)}"
+
+    def available(self):
+        """Currencies offered by /currency: the ones with a symbol first, then the rest"""
+        common = [currency for currency in SYMBOLS if currency in self.rates]
+        return common + sorted(set(self.rates) - set(common))
+
+    async def load(self):
+        rates = await db.get_fx_rates()
+        if rates:
+            self.rates = {**rates, BASE_CURRENCY: 1.0}
+
+    async def refresh(self, source):
+        rates = await source.fetch()
+        await db.save_fx_rates(rates)
+        self.rates = {**self.rates, **rates}
+        print(f"FX rates refreshed: {len(rates)} currencies")
+
+fx = FxTable()
+
+async def user_currency(user_id: int) -> str:
+    """Display currency of a user (DEFAULT_DISPLAY_CURRENCY until /currency is used)"""
+    return fx.resolve(await db.get_user_currency(user_id) or DEFAULT_DISPLAY_CURRENCY)
+
+async def run_fx_refresher(source=None, interval: float = FX_REFRESH_INTERVAL):
+    """Background task: loads the saved table, then refreshes it from `source` periodically.
+    If the source fails the last saved rates stay in use."""
+    source = source or rate_source()
+    await fx.load()
+    while True:
+        if source is not None:
+            try:
+                await fx.refresh(source)
+            except Exception as e:
+                print(f"FX refresh failed ({e}), keeping {len(fx.rates)} saved rates")
+                await fx.load()
+        await asyncio.sleep(interval)
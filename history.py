@@ -0,0 +1,121 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from database import db
+from fx import fx, BASE_CURRENCY
+
+HOUR = 3600
+DAY = 24 * HOUR
+# (label, seconds) windows summarised by /history
+WINDOWS = (("24h", DAY), ("7d", 7 * DAY), ("30d", 30 * DAY))
+# (label, rollup period, number of closes) moving averages
+MOVING_AVERAGES = (("MA24h", "hourly", 24), ("MA7d", "daily", 7), ("MA30d", "daily", 30))
+
+def _signed(value: float) -> str:
+    return "+" if value >= 0 else ""
+
+@dataclass
+class WindowStats:
+    low: float
+    high: float
+    average: float
+    change_percent: float
+
+@dataclass
+class PriceHistory:
+    skin_name: str
+    last_price: float
+    windows: Dict[str, WindowStats] = field(default_factory=dict)
+    moving_averages: Dict[str, float] = field(default_factory=dict)
+    all_time_low: Optional[float] = None
+    all_time_high: Optional[float] = None
+    days_tracked: int = 0
+
+def _columns(rollups: dict) -> Dict[str, np.ndarray]:
+    return {
+        name: np.asarray(values, dtype=np.float64)
+        for name, values in rollups.items() if name != "now"
+    }
+
+def window_stats(columns: Dict[str, np.ndarray], since: float) -> Optional[WindowStats]:
+    """min/max, mean of every observed price (total / samples) and open->close change of the buckets starting at `since` or later"""
+    start = int(np.searchsorted(columns["buckets"], since))
+    if start == len(columns["buckets"]):
+        return None
+    first_open = columns["open"][start]
+    return WindowStats(
+        low=float(columns["low"][start:].min()),
+        high=float(columns["high"][start:].max()),
+        average=float(columns["total"][start:].sum() / columns["samples"][start:].sum()),
+        change_percent=float((columns["close"][-1] / first_open - 1) * 100) if first_open > 0 else 0.0
+    )
+
+def moving_average(closes: np.ndarray, length: int) -> Optional[float]:
+    """Mean of the last `length` closes (None until there are that many)"""
+    if len(closes) < length:
+        return None
+    return float(closes[-length:].mean())
+
+async def get_history(skin_name: str) -> Optional[PriceHistory]:
+    """Statistics from the hourly (last 30 days) and daily (all time) rollups; None if never priced"""
+    hourly = await db.get_price_rollups(skin_name, "hourly", max_age=WINDOWS[-1][1])
+    daily = await db.get_price_rollups(skin_name, "daily")
+    if not daily:
+        return None
+
+    days = _columns(daily)
+    history = PriceHistory(
+        skin_name=skin_name,
+        last_price=float(days["close"][-1]),
+        all_time_low=float(days["low"].min()),
+        all_time_high=float(days["high"].max()),
+        days_tracked=len(days["buckets"])
+    )
+
+    hours = _columns(hourly) if hourly else None
+    if hours is not None:
+        history.last_price = float(hours["close"][-1])
+        for label, seconds in WINDOWS:
+            stats = window_stats(hours, hourly["now"] - seconds)
+            if stats:
+                history.windows[label] = stats
+
+    for label, period, length in MOVING_AVERAGES:
+        columns = hours if period == "hourly" else days
+        value = moving_average(columns["close"], length) if columns is not None else None
+        if value is not None:
+            history.moving_averages[label] = value
+
+    return history
+
+def format_history(history: PriceHistory, currency: str = BASE_CURRENCY) -> str:
+    """Markdown report used by /history, amounts in `currency`"""
+    def money(usd: float) -> str:
+        return fx.format(usd, currency)
+
+    parts = [
+        f"📈 **{history.skin_name}**\n",
+        f"💵 Остання ціна: **{money(history.last_price)}**\n\n"
+    ]
+
+    for label, _ in WINDOWS:
+        stats = history.windows.get(label)
+        if not stats:
+            continue
+        emoji = "🟢" if stats.change_percent >= 0 else "🔴"
+        parts.append(
+            f"🕒 **{label}:** {emoji} {_signed(stats.change_percent)}{stats.change_percent:.1f}%\n"
+            f"   Мін: {money(stats.low)} | Макс: {money(stats.high)} | Сер: {money(stats.average)}\n"
+        )
+
+    if history.moving_averages:
+        parts.append("\n📉 **Ковзні середні:**\n")
+        for label, value in history.moving_averages.items():
+            diff = (history.last_price / value - 1) * 100 if value > 0 else 0
+            parts.append(f"   {label}: {money(value)} (ціна {_signed(diff)}{diff:.1f}%)\n")
+
+    parts.append(
+        f"\n🏔 За весь час ({history.days_tracked} дн.): "
+        f"мін **{money(history.all_time_low)}**, макс **{money(history.all_time_high)}**"
+    )
+    return "".join(parts)
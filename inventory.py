@@ -0,0 +1,35 @@
+from config import INVENTORY_SNAPSHOT_TTL
+from database import db
+from catalog import catalog
+from steam_client import SteamClient, PRIORITY_CHECK
+
+class InventoryStore:
+    """Serves recent inventory snapshots locally and keeps the classid/instanceid description cache"""
+    def __init__(self, client: SteamClient, snapshot_ttl: float = INVENTORY_SNAPSHOT_TTL):
+        self.client = client
+        self.snapshot_ttl = snapshot_ttl
+        self.descriptions = None
+
+    async def get_inventory(self, steam_id: str, priority: int = PRIORITY_CHECK, refresh: bool = False):
+        """Same result as SteamClient.get_inventory, but a snapshot younger than snapshot_ttl is reused"""
+        if not refresh:
+            snapshot = await db.get_inventory_snapshot(steam_id, self.snapshot_ttl)
+            if snapshot is not None:
+                print(f"Inventory of {steam_id} served from snapshot ({len(snapshot)} slots)")
+                return snapshot
+
+        if self.descriptions is None:
+            self.descriptions = await db.get_item_descriptions()
+
+        known = len(self.descriptions)
+        inventory = await self.client.get_inventory(steam_id, priority, descriptions=self.descriptions)
+
+        if len(self.descriptions) > known:
+            new_keys = list(self.descriptions)[known:]
+            new_descriptions = {key: self.descriptions[key] for key in new_keys}
+            await db.save_item_descriptions(new_descriptions)
+            await catalog.learn(new_descriptions.values())
+
+        if inventory:
+            await db.save_inventory_snapshot(steam_id, inventory)
+        return inventory
@@ -0,0 +1,138 @@
+import bisect
+import time
+from contextlib import contextmanager
+from aiogram import BaseMiddleware
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        self.values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+steam_requests = Counter("steam_requests_total", "Steam HTTP responses by endpoint and status (429 included)", ["endpoint", "status"])
+steam_latency = Histogram("steam_request_seconds", "Steam request latency", ["endpoint"])
+steam_route_requests = Counter("steam_route_requests_total", "Steam HTTP responses by egress route and status", ["route", "status"])
+steam_route_health = Gauge("steam_route_health", "Health score of an egress route (1 = no recent 429s or errors)", ["route"])
+steam_route_quarantined = Gauge("steam_route_quarantined", "1 while an egress route is quarantined", ["route"])
+steam_route_rate = Gauge("steam_route_rate", "Current adaptive request budget of an egress route (requests per minute)", ["route"])
+steam_fail_fast = Counter("steam_fail_fast_total", "Steam requests refused at once because every route was quarantined")
+db_query_seconds = Histogram("db_query_seconds", "Time a Database method holds a pool connection", ["method"])
+db_pool_wait_seconds = Histogram("db_pool_wait_seconds", "Time a Database method waits for a pool connection", ["method"])
+monitor_cycle_seconds = Histogram("monitor_cycle_seconds", "Duration of one monitor batch", ["mode"])
+monitor_cycle_skins = Histogram("monitor_cycle_skins", "Skins priced in one monitor batch", ["mode"], buckets=COUNT_BUCKETS)
+alert_notify_lag_seconds = Histogram("alert_notify_lag_seconds", "Time from a triggering price to the delivered Telegram message")
+notifications = Counter("notifications_total", "Alert messages by outcome", ["result"])
+price_cache_lookups = Counter("price_cache_lookups_total", "Price cache lookups by result", ["result"])
+handler_seconds = Histogram("handler_seconds", "Bot handler latency", ["handler"])
+handler_errors = Counter("handler_errors_total", "Bot handlers that raised", ["handler"])
+
+REGISTRY = [
+    steam_requests, steam_latency, steam_route_requests, steam_route_health, steam_route_quarantined,
+    steam_route_rate, steam_fail_fast, db_query_seconds, db_pool_wait_seconds,
+    monitor_cycle_seconds, monitor_cycle_skins, alert_notify_lag_seconds, notifications,
+    price_cache_lookups, handler_seconds, handler_errors
+]
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Measures every matched message/callback handler, labelled by the handler function name"""
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(handler=name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, handler=name)
+
+async def metrics_handler(request: web.Request):
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+def setup_metrics(app: web.Application, path: str = "/metrics"):
+    app.router.add_get(path, metrics_handler)
+
+async def start_metrics_server(host: str, port: int):
+    """Serves /metrics (Prometheus text format) from the current event loop; returns the runner"""
+    app = web.Application()
+    setup_metrics(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
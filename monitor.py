@@ -1,56 +1,262 @@
 import asyncio
-import random
-import aiohttp
+import heapq
+import math
+import time
+from config import (
+    MONITOR_MIN_INTERVAL, MONITOR_MAX_INTERVAL, MONITOR_RELOAD_INTERVAL, MONITOR_BATCH_SIZE,
+    MONITOR_VOLATILITY_HOURS, MONITOR_DEFAULT_VOLATILITY, MONITOR_BULK_PRICING,
+    MONITOR_LEASE_SECONDS, MONITOR_WORKER_IDLE
+)
 from database import db
-from steam_client import SteamClient
+from steam_client import PRIORITY_MONITOR, market_search_query
+from price_cache import PriceCache
+from alerts import AlertIndex
+from notifier import Notifier, TriggeredAlert
+import metrics
 
-async def start_monitoring(bot):
+def refresh_interval(price: float, nearest_target: float, volatility: float, watchers: int) -> float:
+    """Seconds until a skin should be checked again.
+
+    The distance to the nearest target is measured in "typical moves" (relative
+    volatility), so a calm skin 1% above its target is checked about as often as a
+    volatile one 10% above. Skins watched by many users are checked sooner.
+    """
+    if price is None or nearest_target is None or price <= 0:
+        return MONITOR_MIN_INTERVAL
+
+    distance = max(price - nearest_target, 0) / price
+    steps = distance / max(volatility or MONITOR_DEFAULT_VOLATILITY, 0.001)
+    interval = MONITOR_MIN_INTERVAL * (1 + steps) / (1 + math.log(max(watchers, 1)))
+    return min(max(interval, MONITOR_MIN_INTERVAL), MONITOR_MAX_INTERVAL)
+
+class RefreshScheduler:
+    """Priority queue of skins ordered by their next check time (monotonic clock)"""
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+
+    def __contains__(self, skin_name):
+        return skin_name in self._due
+
+    def schedule(self, skin_name: str, due: float, only_earlier: bool = False):
+        current = self._due.get(skin_name)
+        if only_earlier and current is not None and current <= due:
+            return
+        self._due[skin_name] = due
+        heapq.heappush(self._heap, (due, skin_name))
+
+    def discard(self, skin_name: str):
+        self._due.pop(skin_name, None)
+
+    def pop_due(self, now: float, limit: int):
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            when, skin_name = heapq.heappop(self._heap)
+            if self._due.get(skin_name) != when:
+                continue
+            del self._due[skin_name]
+            due.append(skin_name)
+        return due
+
+    def next_due(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+async def fetch_prices(prices: PriceCache, skins, watched=None):
+    """Prices a batch of skins: one bulk pass when the batch shares search pages, get_price() for the rest.
+
+    Returns {skin_name: price or None} for the batch plus any `watched` skins that showed
+    up on the bulk pages. PriceCache queues every price it gets from Steam for skin_prices.
+    """
+    results = {}
+    if MONITOR_BULK_PRICING and len({market_search_query(name) for name in skins}) < len(skins):
+        bulk = await prices.get_prices_bulk(skins, PRIORITY_MONITOR, fresh=True, allow_sweep=True)
+        for skin_name, price in bulk.items():
+            if skin_name in skins or (watched is not None and skin_name in watched):
+                results[skin_name] = price
+
+    for skin_name in skins:
+        if skin_name not in results:
+            _, price = await prices.get_price(skin_name, PRIORITY_MONITOR, fresh=True)
+            results[skin_name] = price
+    return results
+
+def notify_triggered(notifier: Notifier, index: AlertIndex, skin_name: str, current_price: float):
+    for user_id, target in index.pop_triggered(skin_name, current_price):
+        notifier.submit(TriggeredAlert(user_id, skin_name, current_price, target))
+
+def apply_change(change: dict, index: AlertIndex, scheduler: RefreshScheduler, now: float):
+    """Applies one LISTEN/NOTIFY watch-list change to the in-memory state"""
+    op = change.get("op")
+    user_id = change.get("user_id")
+    skin_name = change.get("skin_name")
+
+    if op == "alert" and change.get("target_price") is not None:
+        index.add(user_id, skin_name, change["target_price"])
+        scheduler.schedule(skin_name, now, only_earlier=True)
+    elif op == "restore":
+        # Transient delivery errors outlasted the retries: the alert is still in the DB, keep watching it
+        index.add(user_id, skin_name, change["target_price"])
+        scheduler.schedule(skin_name, now, only_earlier=True)
+    elif op in ("clear", "untrack"):
+        index.remove(user_id, skin_name)
+        if skin_name not in index:
+            scheduler.discard(skin_name)
+
+async def start_monitoring(bot, prices: PriceCache):
     """Background process: checks prices and sends alerts"""
     print("Background monitor started (separate module)...")
-    client = SteamClient()
-    
-    while True:
-        try:
-            alerts = await db.get_all_alerts()
-            
-            if not alerts:
-                await asyncio.sleep(300)
-                continue
-            unique_skins = list(set(row['skin_name'] for row in alerts))
-            print(f"Monitor: Checking {len(unique_skins)} skins...")
-
-            async with aiohttp.ClientSession() as session:
-                for skin_name in unique_skins:
-                    _, current_price = await client.get_price(session, skin_name)
-                    
-                    if current_price:
-                        await db.add_price(skin_name, current_price)
-
-                        for alert in alerts:
-                            if alert['skin_name'] == skin_name:
-                                target = alert['target_price']
-                                user_id = alert['user_id']
-                                
-                                if current_price <= target:
-                                    try:
-                                        await bot.send_message(
-                                            user_id,
-                                            f"🚨 **АЛЕРТ! ЦІНА ВПАЛА!**\n\n"
-                                            f"🔹 **{skin_name}**\n"
-                                            f"📉 Поточна: **{current_price} $**\n"
-                                            f"🎯 Твоя ціль: {target} $\n\n"
-                                            f"Сповіщення спрацювало і вимкнено.",
-                                            parse_mode="Markdown"
-                                        )
-                                        await db.remove_alert(user_id, skin_name)
-                                    except Exception as e:
-                                        print(f"Failed to notify {user_id}: {e}")
-
-                    await asyncio.sleep(random.uniform(5, 10))
-            
-            print("Monitor cycle finished.")
-
-        except Exception as e:
-            print(f"Monitor crashed: {e}")
-
-        await asyncio.sleep(300)
\ No newline at end of file
+
+    scheduler = RefreshScheduler()
+    index = AlertIndex()
+    volatility = {}
+    last_seen = {}
+    next_reload = 0.0
+    changes = asyncio.Queue()
+    listener = None
+    notifier = Notifier(bot, on_failed=lambda alert: changes.put_nowait({
+        "op": "restore", "user_id": alert.user_id, "skin_name": alert.skin_name, "target_price": alert.target_price
+    }))
+    notifier.start()
+
+    try:
+        while True:
+            try:
+                if listener is None or listener.is_closed():
+                    listener = await db.listen(changes.put_nowait)
+                    next_reload = 0.0
+
+                now = time.monotonic()
+                if now >= next_reload:
+                    # Full reload is only a consistency check; changes normally arrive via LISTEN/NOTIFY
+                    while not changes.empty():
+                        changes.get_nowait()
+                    index = AlertIndex.from_rows(await db.get_all_alerts())
+                    volatility = await db.get_price_volatility(index.skins(), MONITOR_VOLATILITY_HOURS)
+
+                    for skin_name in list(last_seen):
+                        if skin_name not in index:
+                            scheduler.discard(skin_name)
+                            del last_seen[skin_name]
+
+                    for skin_name in index.skins():
+                        seen = last_seen.get(skin_name)
+                        if seen is None:
+                            scheduler.schedule(skin_name, now, only_earlier=True)
+                        else:
+                            price, checked_at = seen
+                            interval = refresh_interval(
+                                price, index.nearest_target(skin_name),
+                                volatility.get(skin_name), index.watchers(skin_name)
+                            )
+                            scheduler.schedule(skin_name, checked_at + interval, only_earlier=True)
+
+                    next_reload = now + MONITOR_RELOAD_INTERVAL
+                    print(f"Monitor: watching {len(index.skins())} skins ({len(index)} alerts)")
+
+                while not changes.empty():
+                    apply_change(changes.get_nowait(), index, scheduler, now)
+
+                due = scheduler.pop_due(now, MONITOR_BATCH_SIZE)
+                if not due:
+                    next_due = scheduler.next_due()
+                    wake_at = next_reload if next_due is None else min(next_due, next_reload)
+                    try:
+                        change = await asyncio.wait_for(changes.get(), max(wake_at - time.monotonic(), 0.1))
+                        apply_change(change, index, scheduler, time.monotonic())
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                started = time.monotonic()
+                results = await fetch_prices(prices, due, index)
+                try:
+                    for skin_name, current_price in results.items():
+                        scheduler.discard(skin_name)
+                        if current_price:
+                            notify_triggered(notifier, index, skin_name, current_price)
+
+                        if skin_name not in index:
+                            last_seen.pop(skin_name, None)
+                            continue
+
+                        checked_at = time.monotonic()
+                        last_seen[skin_name] = (current_price, checked_at)
+                        interval = refresh_interval(
+                            current_price, index.nearest_target(skin_name),
+                            volatility.get(skin_name), index.watchers(skin_name)
+                        )
+                        scheduler.schedule(skin_name, checked_at + interval)
+                finally:
+                    notifier.flush()
+
+                elapsed = time.monotonic() - started
+                metrics.monitor_cycle_seconds.observe(elapsed, mode="embedded")
+                metrics.monitor_cycle_skins.observe(len(results), mode="embedded")
+                print(f"Monitor cycle finished: {len(results)} skins in {elapsed:.1f}s. Price cache: {prices.stats()}")
+
+            except Exception as e:
+                print(f"Monitor crashed: {e}")
+                await asyncio.sleep(MONITOR_MIN_INTERVAL)
+
+    finally:
+        await notifier.stop()
+        if listener is not None and not listener.is_closed():
+            await listener.close()
+
+async def run_worker(bot, prices: PriceCache, worker_id: str):
+    """Standalone monitor worker: claims skin batches from monitor_jobs (FOR UPDATE SKIP LOCKED),
+    prices them through its own SteamClient and writes the next run time back.
+    Leases of a crashed worker expire after MONITOR_LEASE_SECONDS and are picked up by others."""
+    print(f"Monitor worker {worker_id} started")
+    next_sync = 0.0
+    notifier = Notifier(bot)
+    notifier.start()
+
+    try:
+        while True:
+            try:
+                if time.monotonic() >= next_sync:
+                    await db.sync_monitor_jobs()
+                    next_sync = time.monotonic() + MONITOR_RELOAD_INTERVAL
+
+                skins = await db.claim_monitor_jobs(worker_id, MONITOR_BATCH_SIZE, MONITOR_LEASE_SECONDS)
+                if not skins:
+                    await asyncio.sleep(MONITOR_WORKER_IDLE)
+                    continue
+
+                started = time.monotonic()
+                index = AlertIndex.from_rows(await db.get_alerts_for(skins))
+                volatility = await db.get_price_volatility(skins, MONITOR_VOLATILITY_HOURS)
+                results = await fetch_prices(prices, skins)
+
+                completed = []
+                try:
+                    for skin_name, current_price in results.items():
+                        if current_price:
+                            notify_triggered(notifier, index, skin_name, current_price)
+                        if index.watchers(skin_name):
+                            interval = refresh_interval(
+                                current_price, index.nearest_target(skin_name),
+                                volatility.get(skin_name), index.watchers(skin_name)
+                            )
+                        else:
+                            # Every alert fired or was cleared: complete_monitor_jobs drops the job
+                            # unless an alert is still in the DB (delivery pending)
+                            interval = MONITOR_MAX_INTERVAL
+                        completed.append((skin_name, current_price, interval))
+                finally:
+                    notifier.flush()
+                    await db.complete_monitor_jobs(worker_id, completed)
+
+                elapsed = time.monotonic() - started
+                metrics.monitor_cycle_seconds.observe(elapsed, mode="worker")
+                metrics.monitor_cycle_skins.observe(len(results), mode="worker")
+                print(f"Worker {worker_id}: {len(skins)} skins in {elapsed:.1f}s")
+
+            except Exception as e:
+                print(f"Monitor worker crashed: {e}")
+                await asyncio.sleep(MONITOR_MIN_INTERVAL)
+    finally:
+        await notifier.stop()
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from config import (
+    NOTIFY_WORKERS, NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_INTERVAL,
+    NOTIFY_MAX_RETRIES, NOTIFY_ALERTS_PER_MESSAGE
+)
+from database import db
+from fx import fx, user_currency, BASE_CURRENCY
+from steam_client import RateLimiter
+import metrics
+
+@dataclass
+class TriggeredAlert:
+    user_id: int
+    skin_name: str
+    price: float
+    target_price: float
+    triggered_at: float = field(default_factory=time.monotonic)
+
+@dataclass
+class Delivery:
+    user_id: int
+    alerts: List[TriggeredAlert]
+    attempts: int = 0
+
+def escape_markdown(text: str) -> str:
+    """Makes user-supplied text literal in a legacy Markdown message"""
+    for char in ("_", "*", "`", "["):
+        text = text.replace(char, "\\" + char)
+    return text
+
+def format_alerts(alerts: List[TriggeredAlert], currency: str = BASE_CURRENCY) -> str:
+    lines = ["🚨 **АЛЕРТ! ЦІНА ВПАЛА!**\n\n"]
+    for alert in alerts:
+        # Not inside ** **: escapes only work outside entities, and a parse error would lose the alert
+        lines.append(
+            f"🔹 {escape_markdown(alert.skin_name)}\n"
+            f"📉 Поточна: **{fx.format(alert.price, currency)}**\n"
+            f"🎯 Твоя ціль: {fx.format(alert.target_price, currency)}\n\n"
+        )
+    lines.append("Сповіщення спрацювало і вимкнено." if len(alerts) == 1 else "Сповіщення спрацювали і вимкнені.")
+    return "".join(lines)
+
+class Notifier:
+    """Outbound alert queue: merges a user's alerts per cycle, respects Telegram's global and
+    per-chat limits, retries on RetryAfter and clears alerts after delivery (or once Telegram
+    refuses them for good)"""
+    def __init__(self, bot, workers: int = NOTIFY_WORKERS,
+                 on_failed: Optional[Callable[[TriggeredAlert], None]] = None):
+        self.bot = bot
+        self.workers = workers
+        self.on_failed = on_failed
+        self.limiter = RateLimiter(requests_per_minute=NOTIFY_GLOBAL_RATE * 60, burst=max(int(NOTIFY_GLOBAL_RATE), 1))
+        self.pending: Dict[int, List[TriggeredAlert]] = {}
+        self.queue = asyncio.Queue()
+        self.chat_ready_at: Dict[int, float] = {}
+        self._tasks = []
+
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10):
+        """Sends what is queued (up to `timeout` seconds), then stops the workers"""
+        self.flush()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Notifier stopped with {self.queue.qsize()} undelivered messages")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def submit(self, alert: TriggeredAlert):
+        """Collects an alert; nothing is sent before flush()"""
+        self.pending.setdefault(alert.user_id, []).append(alert)
+
+    def flush(self):
+        """Queues one message per user with everything submitted since the last flush"""
+        pending, self.pending = self.pending, {}
+        for user_id, alerts in pending.items():
+            for i in range(0, len(alerts), NOTIFY_ALERTS_PER_MESSAGE):
+                self.queue.put_nowait(Delivery(user_id, alerts[i:i + NOTIFY_ALERTS_PER_MESSAGE]))
+
+    async def _worker(self):
+        while True:
+            delivery = await self.queue.get()
+            try:
+                await self._deliver(delivery)
+            except Exception as e:
+                print(f"Notifier error for {delivery.user_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, delivery: Delivery):
+        wait = self.chat_ready_at.get(delivery.user_id, 0) - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self.limiter.acquire()
+        self.chat_ready_at[delivery.user_id] = time.monotonic() + NOTIFY_CHAT_INTERVAL
+        delivery.attempts += 1
+
+        try:
+            currency = await user_currency(delivery.user_id)
+            await self.bot.send_message(delivery.user_id, format_alerts(delivery.alerts, currency), parse_mode="Markdown")
+        except TelegramRetryAfter as e:
+            print(f"Telegram flood control: retry {delivery.user_id} in {e.retry_after}s")
+            self.chat_ready_at[delivery.user_id] = time.monotonic() + e.retry_after
+            self._retry(delivery)
+            return
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Blocked bot or a message Telegram refuses: resending would fail the same way
+            # on every cycle, so the alerts are dropped instead of restored
+            print(f"Failed to notify {delivery.user_id}, dropping alerts: {e}")
+            self.failed += 1
+            result = "forbidden" if isinstance(e, TelegramForbiddenError) else "rejected"
+            metrics.notifications.inc(result=result)
+            await db.remove_alerts([(a.user_id, a.skin_name, a.target_price) for a in delivery.alerts])
+            return
+        except Exception as e:
+            print(f"Failed to notify {delivery.user_id} (attempt {delivery.attempts}): {e}")
+            self.chat_ready_at[delivery.user_id] = time.monotonic() + 2 ** delivery.attempts
+            self._retry(delivery)
+            return
+
+        self.sent += 1
+        metrics.notifications.inc(result="sent")
+        delivered_at = time.monotonic()
+        for alert in delivery.alerts:
+            metrics.alert_notify_lag_seconds.observe(delivered_at - alert.triggered_at)
+        await db.remove_alerts([(a.user_id, a.skin_name, a.target_price) for a in delivery.alerts])
+
+    def _retry(self, delivery: Delivery):
+        if delivery.attempts < NOTIFY_MAX_RETRIES:
+            delay = max(self.chat_ready_at.get(delivery.user_id, 0) - time.monotonic(), 0)
+            asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, delivery)
+            return
+
+        self.failed += 1
+        metrics.notifications.inc(result="failed")
+        if self.on_failed:
+            for alert in delivery.alerts:
+                self.on_failed(alert)
@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from config import STEAM_FEE, VALUATION_PRICE_MAX_AGE, PORTFOLIO_CHANGE_HOURS, BULK_PAGE_SIZE
+from database import db
+from fx import fx, BASE_CURRENCY
+from price_cache import PriceCache
+from steam_client import PRIORITY_CHECK, PRIORITY_MONITOR
+
+def _percent(diff: float, base: float) -> float:
+    return (diff / base) * 100 if base > 0 else 0
+
+def _signed(value: float) -> str:
+    return "+" if value >= 0 else ""
+
+@dataclass
+class PortfolioItem:
+    skin_name: str
+    buy_price: Optional[float]
+    target_price: Optional[float]
+    market_price: Optional[float]
+    net_price: Optional[float]
+    pnl: Optional[float]
+    quantity: int = 1
+
+    @property
+    def pnl_percent(self) -> float:
+        return _percent(self.pnl, self.buy_price) if self.pnl is not None else 0
+
+@dataclass
+class Portfolio:
+    items: List[PortfolioItem] = field(default_factory=list)
+    total_market_value: float = 0
+    total_net_value: float = 0
+    total_buy_cost: float = 0
+    # Market value PORTFOLIO_CHANGE_HOURS ago, from the portfolio value history
+    previous_value: Optional[float] = None
+
+    @property
+    def total_pnl(self) -> float:
+        return self.total_market_value - self.total_buy_cost
+
+    @property
+    def total_net_pnl(self) -> float:
+        return self.total_net_value - self.total_buy_cost
+
+async def get_portfolio(user_id: int) -> Portfolio:
+    """The user's tracked items with the totals the price writer keeps up to date (no aggregation on read)"""
+    rows, totals = await db.get_portfolio(user_id, STEAM_FEE, PORTFOLIO_CHANGE_HOURS)
+    if not rows:
+        return Portfolio()
+
+    return Portfolio(
+        items=[
+            PortfolioItem(
+                skin_name=row['skin_name'],
+                buy_price=row['buy_price'],
+                target_price=row['target_price'],
+                market_price=row['market_price'],
+                net_price=row['net_price'],
+                pnl=row['pnl'],
+                quantity=row['quantity']
+            )
+            for row in rows
+        ],
+        total_market_value=totals['market_value'] if totals else 0,
+        total_net_value=totals['market_value'] / STEAM_FEE if totals else 0,
+        total_buy_cost=totals['buy_cost'] if totals else 0,
+        previous_value=totals['previous_value'] if totals else None
+    )
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    updated: int = 0
+    priced: int = 0
+    unpriced: List[str] = field(default_factory=list)
+
+async def import_inventory(user_id: int, inventory: Dict[str, int], prices: PriceCache) -> Optional[ImportResult]:
+    """Adds every item of an inventory {skin_name: count} to the user's portfolio in one upsert.
+
+    Only prices that need no Steam request are attached here: recently stored ones
+    and cache hits. The rest is left for price_imported(). None if the upsert failed.
+    """
+    counts = await db.import_track_skins(user_id, inventory)
+    if counts is None:
+        return None
+    result = ImportResult(added=counts[0], updated=counts[1])
+
+    # A cached price was queued for skin_prices when it came from Steam: it only needs no second request
+    known = {row['skin_name'] for row in await db.get_latest_prices(list(inventory), VALUATION_PRICE_MAX_AGE)}
+    known.update(name for name in inventory if name not in known and prices.peek(name) is not None)
+
+    result.priced = len(known)
+    result.unpriced = [name for name in inventory if name not in known]
+    return result
+
+async def price_imported(skin_names: List[str], prices: PriceCache) -> List[str]:
+    """A few per-skin search pages over freshly imported skins (largest groups first, one
+    page per BULK_PAGE_SIZE skins, never a market sweep); returns the skins still unpriced"""
+    if not skin_names:
+        return []
+    max_pages = -(-len(skin_names) // BULK_PAGE_SIZE)
+    found = await prices.get_prices_bulk(skin_names, PRIORITY_CHECK, max_pages=max_pages)
+    return [skin_name for skin_name in skin_names if skin_name not in found]
+
+async def price_in_background(skin_names: List[str], prices: PriceCache):
+    """Prices what price_imported() left, one skin at a time in the monitor lane;
+    PriceCache stores each price and the portfolio totals follow"""
+    for skin_name in skin_names:
+        if not prices.client.available():
+            return
+        await prices.get_price(skin_name, PRIORITY_MONITOR)
+
+def format_portfolio(portfolio: Portfolio, currency: str = BASE_CURRENCY) -> str:
+    """Markdown report used by /prices and the "show_prices" button, amounts in `currency`"""
+    def money(usd: float) -> str:
+        return fx.format(usd, currency)
+
+    parts = ["📊 **Твій портфель:**\n\n"]
+
+    for item in portfolio.items:
+        if not item.market_price:
+            parts.append(f"🔹 **{item.skin_name}**\n   ⏳ Очікування...\n\n")
+            continue
+
+        parts.append(f"🔹 **{item.skin_name}**" + (f" x{item.quantity}" if item.quantity > 1 else "") + "\n")
+        parts.append(f"   💵 Steam: {money(item.market_price)}")
+        if item.quantity > 1:
+            parts.append(f" (Σ {money(item.market_price * item.quantity)})")
+        parts.append("\n")
+        parts.append(f"   🤲 На руки: **{money(item.net_price)}**")
+
+        if item.buy_price:
+            emoji = "🟢" if item.pnl >= 0 else "🔴"
+            sign = _signed(item.pnl)
+            parts.append(
+                f" | Купив: {money(item.buy_price)}\n"
+                f"   {emoji} PnL: **{sign}{money(item.pnl)} ({sign}{item.pnl_percent:.1f}%)**"
+            )
+
+        if item.target_price:
+            parts.append(f"\n   🔔 Алерт: **< {money(item.target_price)}**")
+
+        parts.append("\n\n")
+
+    if portfolio.total_market_value > 0:
+        total_diff = portfolio.total_pnl
+        total_net_diff = portfolio.total_net_pnl
+        sign = _signed(total_diff)
+        sign_net = _signed(total_net_diff)
+
+        parts.append("-" * 25 + "\n")
+        parts.append("💰 **БАЛАНС:**\n")
+        parts.append(f"🏦 Активи (Steam): **{money(portfolio.total_market_value)}**\n")
+        parts.append(f"🤲 Якщо продати зараз: **{money(portfolio.total_net_value)}**\n")
+
+        if portfolio.previous_value:
+            change = portfolio.total_market_value - portfolio.previous_value
+            sign_change = _signed(change)
+            parts.append(
+                f"{'📈' if change >= 0 else '📉'} За {PORTFOLIO_CHANGE_HOURS:g} год: "
+                f"{sign_change}{money(change)} ({sign_change}{_percent(change, portfolio.previous_value):.1f}%)\n"
+            )
+
+        if portfolio.total_buy_cost > 0:
+            parts.append(f"\n📊 Інвестовано: {money(portfolio.total_buy_cost)}\n")
+            parts.append(
+                f"{'🚀' if total_diff >= 0 else '🔻'} Профіт (Paper): "
+                f"**{sign}{money(total_diff)} ({sign}{_percent(total_diff, portfolio.total_buy_cost):.1f}%)**\n"
+            )
+            parts.append(
+                f"{'🚀' if total_net_diff >= 0 else '🔻'} Профіт після продажу: "
+                f"**{sign_net}{money(total_net_diff)} ({sign_net}{_percent(total_net_diff, portfolio.total_buy_cost):.1f}%)**"
+            )
+
+    return "".join(parts)
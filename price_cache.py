@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import PRICE_CACHE_TTL, PRICE_CACHE_SIZE, PRICE_DB_MAX_AGE, BULK_MAX_PAGES
+from database import db
+from catalog import catalog
+from steam_client import SteamClient, PRIORITY_INTERACTIVE, load_key
+from price_parser import PriceOverview
+import metrics
+
+class PriceCache:
+    """TTL/LRU cache in front of SteamClient.get_price with request coalescing.
+    Every price that comes from Steam (and only those) is queued for skin_prices here."""
+    def __init__(self, client: SteamClient, ttl: float = PRICE_CACHE_TTL,
+                 maxsize: int = PRICE_CACHE_SIZE, db_max_age: float = PRICE_DB_MAX_AGE):
+        self.client = client
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.db_max_age = db_max_age
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def peek(self, skin_name: str):
+        """Returns the cached price if it is still fresh, otherwise None"""
+        entry = self._entries.get(skin_name)
+        if entry is None:
+            return None
+
+        price, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            del self._entries[skin_name]
+            return None
+
+        self._entries.move_to_end(skin_name)
+        return price
+
+    def overview(self, skin_name: str) -> Optional[PriceOverview]:
+        """Median price and volume that came with the cached price (None for bulk/DB prices)"""
+        entry = self._entries.get(skin_name)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[2]
+
+    def put(self, skin_name: str, price: float, ttl: float = None, overview: PriceOverview = None):
+        self._entries[skin_name] = (price, time.monotonic() + (ttl or self.ttl), overview)
+        self._entries.move_to_end(skin_name)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_price(self, skin_name: str, priority: int = PRIORITY_INTERACTIVE, fresh: bool = False):
+        """Same contract as SteamClient.get_price; fresh=True skips the cache and DB lookups"""
+        if not fresh:
+            price = self.peek(skin_name)
+            if price is not None:
+                self.hits += 1
+                metrics.price_cache_lookups.inc(result="hit")
+                return skin_name, price
+
+        # A fresh caller must not get a stored price from a non-fresh load; anyone may use a fresh one
+        key = (skin_name, True)
+        if not fresh and key not in self._inflight:
+            key = (skin_name, False)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            metrics.price_cache_lookups.inc(result="coalesced")
+            task, load_priority = inflight
+            if priority < load_priority:
+                # The shared load is served in the best lane of anyone waiting for it
+                self._inflight[key] = (task, priority)
+                self.client.promote(key, priority)
+        else:
+            key = (skin_name, fresh)
+            task = asyncio.create_task(self._load(skin_name, priority, fresh))
+            self._inflight[key] = (task, priority)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return skin_name, await asyncio.shield(task)
+
+    async def _load(self, skin_name: str, priority: int, fresh: bool):
+        load_key.set((skin_name, fresh))
+        if not fresh:
+            price = await db.get_fresh_price(skin_name, self.db_max_age)
+            if price is not None:
+                self.db_hits += 1
+                metrics.price_cache_lookups.inc(result="db_hit")
+                self.put(skin_name, price)
+                return price
+
+        self.misses += 1
+        metrics.price_cache_lookups.inc(result="miss")
+        # Callers that attached while the DB was checked may have raised the priority
+        _, priority = self._inflight.get((skin_name, fresh), (None, priority))
+        overview = await self.client.get_price_overview(skin_name, priority)
+        price = overview.lowest if overview else None
+        if price is not None:
+            self.put(skin_name, price, overview=overview)
+            await db.add_price(skin_name, price, overview.median, overview.volume)
+            await catalog.learn([skin_name])
+        return price
+
+    async def get_prices_bulk(self, skin_names, priority: int = PRIORITY_INTERACTIVE, fresh: bool = False,
+                              allow_sweep: bool = False, max_pages: int = BULK_MAX_PAGES):
+        """Prices many skins with the bulk search backend; every price seen is cached.
+        Returns {skin_name: price} for the requested skins that were found plus any
+        other skins that appeared on the same pages."""
+        found = {}
+        missing = []
+        for skin_name in skin_names:
+            price = None if fresh else self.peek(skin_name)
+            if price is not None:
+                self.hits += 1
+                metrics.price_cache_lookups.inc(result="hit")
+                found[skin_name] = price
+            else:
+                missing.append(skin_name)
+
+        if missing:
+            self.misses += len(missing)
+            metrics.price_cache_lookups.inc(len(missing), result="miss")
+            page_prices = await self.client.get_prices_bulk(missing, priority, allow_sweep, max_pages)
+            for skin_name, price in page_prices.items():
+                self.put(skin_name, price)
+                await db.add_price(skin_name, price)
+            await catalog.learn(page_prices)
+            found.update(page_prices)
+        return found
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
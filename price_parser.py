@@ -0,0 +1,65 @@
+"""Parsing of Steam's /market/priceoverview/ responses.
+
+Prices come formatted for the requested currency ("$1,234.56", "1.234,56€",
+"1 234,56 pуб.", "12,--€", "CHF 1'234.50", "₩ 12,345"), so the decimal separator
+is inferred from the number itself instead of stripping known symbols.
+"""
+import json
+import re
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# A number with any of the thousands/decimal separators Steam uses
+_NUMBER = re.compile(r"\d[\d.,' \u00a0\u202f]*")
+_TRAILING = ".,' \u00a0\u202f"
+_SEPARATORS = str.maketrans("", "", _TRAILING)
+_NON_DIGITS = re.compile(r"\D")
+
+class PriceOverview(NamedTuple):
+    lowest: Optional[float]
+    median: Optional[float]
+    volume: Optional[int]
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """Price from a localized string. A "," or "." is the decimal separator only if one
+    or two digits follow it; otherwise every separator groups thousands."""
+    if not text:
+        return None
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+
+    number = match.group().rstrip(_TRAILING)
+    if len(number) > 2 and number[-3] in ",.":
+        whole, fraction = number[:-3], number[-2:]
+    elif len(number) > 1 and number[-2] in ",.":
+        whole, fraction = number[:-2], number[-1:]
+    else:
+        whole, fraction = number, "0"
+    if not whole.isdigit():
+        whole = whole.translate(_SEPARATORS) or "0"
+    return float(f"{whole}.{fraction}")
+
+def parse_volume(text) -> Optional[int]:
+    """Units sold in the last 24h ("1,024" / "1.024" / "1 024")"""
+    if text is None or isinstance(text, int):
+        return text
+    if not text.isdigit():
+        text = _NON_DIGITS.sub("", text)
+    return int(text) if text else None
+
+def parse_price_overview(body: bytes) -> Optional[PriceOverview]:
+    """PriceOverview from the raw response body; None unless Steam reported success"""
+    data = json_loads(body)
+    if not data or data.get("success") is not True:
+        return None
+    return PriceOverview(
+        lowest=parse_price(data.get("lowest_price")),
+        median=parse_price(data.get("median_price")),
+        volume=parse_volume(data.get("volume"))
+    )
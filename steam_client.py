@@ -1,51 +1,288 @@
-import aiohttp
 import re
+import time
+import heapq
 import asyncio
+import itertools
+import contextvars
 import urllib.parse
-from config import BASE_URL, APP_ID, CURRENCY
+from typing import Optional
+from contextlib import asynccontextmanager
+from config import (
+    BASE_URL, INVENTORY_URL, SEARCH_URL, APP_ID, CURRENCY,
+    STEAM_REQUESTS_PER_MINUTE, STEAM_BURST, INVENTORY_PAGE_SIZE,
+    BULK_PAGE_SIZE, BULK_FULL_SWEEP_GROUPS, BULK_MAX_PAGES, STEAM_PROXY, STEAM_SOURCE_ADDRESS
+)
+import metrics
+from egress import RoutePool, SteamUnavailable, retry_after
+from price_parser import PriceOverview, parse_price_overview
+
+# Priority lanes: a lower value is served first
+PRIORITY_INTERACTIVE = 0  # /find, /add
+PRIORITY_CHECK = 1        # /check
+PRIORITY_MONITOR = 2      # background sweeps
+
+# Set by a coalesced load (PriceCache) so its queued request can later be promoted to a better lane
+load_key = contextvars.ContextVar("load_key", default=None)
+
+WEAR_SUFFIX = re.compile(r"\s*\((Factory New|Minimal Wear|Field-Tested|Well-Worn|Battle-Scarred)\)$")
+
+def market_search_query(skin_name: str) -> str:
+    """Search term that lists every wear/StatTrak/Souvenir variant of a skin on one page"""
+    name = WEAR_SUFFIX.sub("", skin_name)
+    for prefix in ("★ ", "StatTrak™ ", "Souvenir "):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name
+
+class RateLimiter:
+    """Token bucket shared by every Steam request, with priority lanes for waiters"""
+    def __init__(self, requests_per_minute: float = STEAM_REQUESTS_PER_MINUTE, burst: int = STEAM_BURST):
+        self.rate = requests_per_minute / 60
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._task = None
+        # load_key -> (priority, future) of queued requests that may be promoted
+        self._keyed = {}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _delay(self) -> float:
+        """Seconds until the next request may be sent"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def set_rate(self, requests_per_minute: float):
+        self._refill(time.monotonic())
+        self.rate = requests_per_minute / 60
+
+    def wait_time(self) -> float:
+        """Expected wait of a request queued now, behind every current waiter"""
+        return self._delay() + len(self._waiters) / self.rate
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        if not self._waiters and self._delay() == 0:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        key = load_key.get()
+        if key is not None:
+            self._keyed[key] = (priority, future)
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        finally:
+            if key is not None and self._keyed.get(key, (None, None))[1] is future:
+                del self._keyed[key]
+
+    def promote(self, key, priority: int):
+        """Moves the queued request of load `key` to a better lane (its old heap entry is skipped)"""
+        queued = self._keyed.get(key)
+        if queued is None or priority >= queued[0] or queued[1].done():
+            return
+        self._keyed[key] = (priority, queued[1])
+        heapq.heappush(self._waiters, (priority, next(self._seq), queued[1]))
+
+    async def _dispatch(self):
+        while self._waiters:
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        self._task = None
 
 class SteamClient:
-    def __init__(self):
-        self.base_url = BASE_URL
-        self.inventory_url = "https://steamcommunity.com/inventory/{}/730/2"
+    def __init__(self, base_url: str = BASE_URL, inventory_url: str = INVENTORY_URL,
+                 search_url: str = SEARCH_URL, limiter: RateLimiter = None,
+                 proxy: str = STEAM_PROXY, source_address: str = STEAM_SOURCE_ADDRESS,
+                 routes: RoutePool = None):
+        """Steam traffic goes through `routes`; by default the STEAM_ROUTES pool, or a single
+        route over proxy/source_address. Passing `limiter` means a single route using it."""
+        self.base_url = base_url
+        self.inventory_url = inventory_url
+        self.search_url = search_url
+        self.routes = routes or RoutePool.from_config(proxy=proxy, source_address=source_address, limiter=limiter)
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "application/json, text/javascript, */*; q=0.01",
             "Accept-Language": "en-US,en;q=0.9",
             "X-Requested-With": "XMLHttpRequest",
             "Referer": "https://steamcommunity.com/market/"
         }
 
-    async def get_price(self, session, item_name: str):
+    @property
+    def session(self):
+        """Session of the first route (the only one unless STEAM_ROUTES is set)"""
+        return self.routes.routes[0].session
+
+    async def start(self):
+        """Opens one shared keep-alive session per egress route"""
+        self.routes.open(self.headers)
+
+    async def close(self):
+        if self.session:
+            await self.routes.close()
+            print("Steam HTTP sessions closed")
+
+    @asynccontextmanager
+    async def _get(self, endpoint: str, url: str, priority: int, **kwargs):
+        """GET through the best usable route once its budget allows. Records latency and
+        status code (429s included) per endpoint and per route, and feeds the status and
+        Retry-After back into the route's budget. Raises SteamUnavailable without sending
+        anything while every route is quarantined."""
+        route = await self.routes.acquire(priority)
+        sent_at = time.monotonic()
+        started = time.perf_counter()
+        status = None
+        wait = None
+        try:
+            async with route.get(url, **kwargs) as response:
+                status = response.status
+                wait = retry_after(response.headers.get("Retry-After"))
+                yield response
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            self.routes.release(route)
+            if status != "cancelled":
+                route.record(status, sent_at, wait)
+            metrics.steam_latency.observe(time.perf_counter() - started, endpoint=endpoint)
+            metrics.steam_requests.inc(endpoint=endpoint, status=str(status or "error"))
+
+    def available(self) -> bool:
+        """False while Steam is refusing every route; requests fail fast until then"""
+        return self.routes.available()
+
+    def promote(self, key, priority: int):
+        """Serves the queued request of load `key` (see load_key) in a better lane"""
+        for route in self.routes.routes:
+            route.limiter.promote(key, priority)
+
+    async def get_price_overview(self, item_name: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[PriceOverview]:
+        """Lowest price, median price and 24h volume of one item; None if Steam did not answer"""
+        if not self.session:
+            await self.start()
+
         encoded_name = urllib.parse.quote(item_name)
         url = f"{self.base_url}?appid={APP_ID}&currency={CURRENCY}&market_hash_name={encoded_name}"
         
         try:
-            await asyncio.sleep(0.5) 
-            
-            async with session.get(url, headers=self.headers) as response:
+            async with self._get("priceoverview", url, priority) as response:
                 if response.status == 429:
                     print(f"Rate Limit (429) for: {item_name}")
-                    return item_name, None
+                    return None
                 
                 if response.status != 200:
                     print(f"Error {response.status} for: {item_name}")
-                    return item_name, None
+                    return None
                 
-                data = await response.json()
-                if data and data.get("success") is True:
-                    raw_price = data.get("lowest_price")
-                    if raw_price:
-                        clean_price = raw_price.replace("$", "").replace(",", "").replace("USD", "").strip()
-                        try:
-                            return item_name, float(clean_price)
-                        except ValueError:
-                            return item_name, float(clean_price.replace(",", ""))
-                            
-                return item_name, None
+                return parse_price_overview(await response.read())
+        except SteamUnavailable:
+            return None
         except Exception as e:
             print(f"[Price Error] {item_name}: {e}")
-            return item_name, None
+            return None
+
+    async def get_price(self, item_name: str, priority: int = PRIORITY_INTERACTIVE):
+        overview = await self.get_price_overview(item_name, priority)
+        return item_name, overview.lowest if overview else None
+
+    async def search_market(self, query: str = "", start: int = 0, count: int = BULK_PAGE_SIZE,
+                            priority: int = PRIORITY_MONITOR):
+        """One page of the market search listing: ({market_hash_name: lowest price}, total_count).
+        Returns (None, 0) if Steam did not answer."""
+        if not self.session:
+            await self.start()
+
+        params = {
+            "appid": APP_ID, "currency": CURRENCY, "norender": 1,
+            "query": query, "start": start, "count": count,
+            "search_descriptions": 0, "sort_column": "name", "sort_dir": "asc"
+        }
+        try:
+            async with self._get("search", self.search_url, priority, params=params) as response:
+                if response.status == 429:
+                    print(f"Rate Limit (429) for market search: {query or '*'} @ {start}")
+                    return None, 0
+
+                if response.status != 200:
+                    print(f"Error {response.status} for market search: {query or '*'} @ {start}")
+                    return None, 0
+
+                data = await response.json()
+        except SteamUnavailable:
+            return None, 0
+        except Exception as e:
+            print(f"[Search Error] {query or '*'} @ {start}: {e}")
+            return None, 0
+
+        if not data or not data.get("success"):
+            return None, 0
+
+        prices = {}
+        for result in data.get("results") or []:
+            cents = result.get("sell_price")
+            if cents and result.get("sell_listings", 0) > 0:
+                prices[result["hash_name"]] = cents / 100
+        return prices, data.get("total_count", 0)
+
+    async def get_prices_bulk(self, skin_names, priority: int = PRIORITY_MONITOR,
+                              allow_sweep: bool = False, max_pages: int = BULK_MAX_PAGES):
+        """Prices many skins from the paged search listing instead of one priceoverview call each.
+
+        Skins are grouped by search term (all wears and StatTrak variants share a page) and
+        the largest groups are searched first, at most `max_pages` requests in total. Only
+        background callers may pass `allow_sweep`: with more groups than BULK_FULL_SWEEP_GROUPS
+        the whole market is then swept page by page instead, which takes many minutes.
+        Returns every price seen, which may include extra skins; skins missing from the
+        result should fall back to get_price().
+        """
+        wanted = set(skin_names)
+        found = {}
+        groups = {}
+        for skin_name in wanted:
+            groups.setdefault(market_search_query(skin_name), set()).add(skin_name)
+
+        if allow_sweep and len(groups) > BULK_FULL_SWEEP_GROUPS:
+            searches = [("", None)]
+        else:
+            searches = sorted(groups.items(), key=lambda group: len(group[1]), reverse=True)
+        max_pages = min(max_pages, BULK_MAX_PAGES)
+        pages = 0
+        for query, names in searches:
+            names = names or wanted
+            # A skin's own search term fits on one page; only the full sweep pages further
+            query_pages = 1 if query else max_pages
+            start = 0
+            while query_pages > 0 and pages < max_pages and not names <= found.keys():
+                page, total = await self.search_market(query, start, BULK_PAGE_SIZE, priority)
+                pages += 1
+                query_pages -= 1
+                if not page:
+                    break
+                found.update(page)
+                start += BULK_PAGE_SIZE
+                if start >= total:
+                    break
+
+        print(f"Bulk pricing: {len(wanted & found.keys())}/{len(wanted)} skins from {pages} requests")
+        return found
 
     def extract_steam_id(self, url: str):
         match = re.search(r"7656\d{13}", url)
@@ -53,74 +290,83 @@ class SteamClient:
             return match.group(0)
         return None
 
-    async def get_inventory(self, session, steam_id: str):
-        url = self.inventory_url.format(steam_id)
+    async def iter_inventory_pages(self, steam_id: str, priority: int = PRIORITY_CHECK):
+        """Yields (assets, descriptions) for every inventory page until Steam reports no more items"""
+        if not self.session:
+            await self.start()
 
-        full_inventory = {}
-        
-        params = {"l": "english", "count": 100}
-        headers = self.headers.copy()
-        headers["Referer"] = f"https://steamcommunity.com/profiles/{steam_id}/inventory"
+        url = self.inventory_url.format(steam_id)
+        params = {"l": "english", "count": INVENTORY_PAGE_SIZE}
+        headers = {"Referer": f"https://steamcommunity.com/profiles/{steam_id}/inventory"}
         
         start_assetid = None
         page = 1
-        
-        print(f"Starting inventory scan for {steam_id}...")
 
         while True:
             if start_assetid:
                 params["start_assetid"] = start_assetid
             
             try:
-                if page > 1:
-                    await asyncio.sleep(1.5)
-
-                async with session.get(url, headers=headers, params=params) as response:
+                async with self._get("inventory", url, priority, headers=headers, params=params) as response:
                     if response.status == 429:
-                        print("Rate limit hit! Waiting 5 seconds...")
-                        await asyncio.sleep(5)
+                        print(f"Rate limit hit on page {page}, retrying at a lower rate...")
                         continue
                         
                     if response.status != 200:
                         print(f"Error on page {page}: {response.status}")
-                        break 
+                        return
                     
                     data = await response.json()
-                    if not data:
-                        break
+            except SteamUnavailable:
+                raise
+            except Exception as e:
+                print(f"[Pagination Error] {e}")
+                return
 
-                    assets = data.get("assets", [])
-                    descriptions = data.get("descriptions", [])
-                    
-                    if not assets:
-                        break
+            if not data or not data.get("assets"):
+                return
 
-                    print(f"Page {page}: found {len(assets)} items")
+            print(f"Page {page}: found {len(data['assets'])} items")
+            yield data["assets"], data.get("descriptions", [])
 
-                    item_names = {}
-                    for desc in descriptions:
-                        if desc.get("marketable") == 1:
-                            item_names[desc["classid"]] = desc["market_hash_name"]
+            last_assetid = data.get("last_assetid")
+            if not data.get("more_items", last_assetid is not None) or not last_assetid or last_assetid == start_assetid:
+                return
+            start_assetid = last_assetid
+            page += 1
 
-                    for asset in assets:
-                        classid = asset["classid"]
-                        if classid in item_names:
-                            skin_name = item_names[classid]
-                            full_inventory[skin_name] = full_inventory.get(skin_name, 0) + 1
+    async def get_inventory(self, steam_id: str, priority: int = PRIORITY_CHECK, descriptions: dict = None):
+        """Returns {market_hash_name: count} of marketable items.
 
-                    if "last_assetid" in data:
-                        start_assetid = data["last_assetid"]
-                        page += 1
+        `descriptions` is a (classid, instanceid) -> market_hash_name cache of
+        marketable items; it is consulted and extended while the pages stream in.
+        """
+        if descriptions is None:
+            descriptions = {}
+        scanned = {}
+        full_inventory = {}
 
-                        if page > 20: 
-                            print("Bot page limit reached.")
-                            break
-                    else:
-                        break
+        print(f"Starting inventory scan for {steam_id}...")
+
+        try:
+            async for assets, page_descriptions in self.iter_inventory_pages(steam_id, priority):
+                for desc in page_descriptions:
+                    key = (desc["classid"], desc.get("instanceid", "0"))
+                    skin_name = desc["market_hash_name"] if desc.get("marketable") == 1 else None
+                    scanned[key] = skin_name
+                    # Trade-locked items are not marketable yet (and carry cache_expiration): never cache them
+                    if skin_name and "cache_expiration" not in desc and key not in descriptions:
+                        descriptions[key] = skin_name
+
+                for asset in assets:
+                    key = (asset["classid"], asset.get("instanceid", "0"))
+                    skin_name = scanned.get(key, descriptions.get(key))
+                    if skin_name:
+                        full_inventory[skin_name] = full_inventory.get(skin_name, 0) + int(asset.get("amount", 1))
+        except SteamUnavailable as e:
+            # A partial inventory would be valued and snapshotted as if it were complete
+            print(f"Inventory scan of {steam_id} aborted: {e}")
+            return {}
 
-            except Exception as e:
-                print(f"[Pagination Error] {e}")
-                break
-        
         print(f"Scan complete. Unique slots: {len(full_inventory)}")
-        return full_inventory
\ No newline at end of file
+        return full_inventory
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from egress import THROTTLE_STRIKES, RoutePool, parse_route
+from steam_client import PRIORITY_MONITOR
+
+
+def test_same_generation_429s_only_slow_the_route_down():
+    route = parse_route("direct#30", 0)
+    pool = RoutePool([route])
+    rpm = route.limiter.rate * 60
+    sent_at = time.monotonic()
+
+    for _ in range(THROTTLE_STRIKES + 1):
+        route.record(429, sent_at)
+
+    assert route.limiter.rate * 60 < rpm
+    assert route.throttle_strikes == 1
+    assert not route.quarantined()
+    assert asyncio.run(pool.acquire(PRIORITY_MONITOR)) is route
+
+
+def test_429s_in_successive_generations_quarantine_the_route():
+    route = parse_route("direct#30", 0)
+
+    for _ in range(THROTTLE_STRIKES):
+        route.record(429, time.monotonic())
+
+    assert route.quarantined()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import (
+    STEAM_PRICE_RETRIES, VALUATION_WORKERS, VALUATION_PROGRESS_INTERVAL,
+    VALUATION_PRICE_MAX_AGE, VALUATION_CHECKPOINT_ROWS
+)
+from database import db
+from price_cache import PriceCache
+from steam_client import PRIORITY_CHECK, market_search_query
+
+ProgressCallback = Callable[[int, int, Optional[str]], Awaitable[None]]
+
+@dataclass
+class InventoryValuation:
+    priced: List[Tuple[str, float, int, float]] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    from_steam: int = 0
+
+    @property
+    def total(self) -> float:
+        return sum(item_total for _, _, _, item_total in self.priced)
+
+async def value_inventory(steam_id: str, inventory: Dict[str, int], prices: PriceCache,
+                          on_progress: ProgressCallback = None) -> InventoryValuation:
+    """Prices an inventory {skin_name: count}.
+
+    Checkpointed, cached and recently stored prices are used first; only the misses
+    go to Steam through a bounded set of workers. Misses that share a search term are
+    priced from one search page, the rest (and whatever the page lacked) by get_price().
+    Every price found is checkpointed per profile, so repeating /check of the same
+    profile resumes instead of starting over.
+    """
+    total = len(inventory)
+    found = await db.get_valuation_checkpoint(steam_id, VALUATION_PRICE_MAX_AGE)
+
+    for skin_name in inventory:
+        if skin_name not in found:
+            price = prices.peek(skin_name)
+            if price is not None:
+                found[skin_name] = price
+
+    missing = [name for name in inventory if name not in found]
+    if missing:
+        for row in await db.get_latest_prices(missing, VALUATION_PRICE_MAX_AGE):
+            found[row['skin_name']] = row['price']
+
+    groups = {}
+    for skin_name in inventory:
+        if skin_name not in found:
+            groups.setdefault(market_search_query(skin_name), []).append(skin_name)
+
+    result = InventoryValuation()
+    pending_checkpoint = [(name, price) for name, price in found.items() if name in inventory]
+    queue = asyncio.Queue()
+    for names in groups.values():
+        queue.put_nowait(names)
+
+    done = total - sum(len(names) for names in groups.values())
+    last_progress = 0.0
+
+    async def report(current: Optional[str], force: bool = False):
+        nonlocal last_progress
+        if on_progress is None:
+            return
+        now = time.monotonic()
+        if force or now - last_progress >= VALUATION_PROGRESS_INTERVAL:
+            last_progress = now
+            await on_progress(done, total, current)
+
+    async def flush_checkpoint(force: bool = False):
+        nonlocal pending_checkpoint
+        if pending_checkpoint and (force or len(pending_checkpoint) >= VALUATION_CHECKPOINT_ROWS):
+            batch, pending_checkpoint = pending_checkpoint, []
+            await db.save_valuation_checkpoint(steam_id, batch)
+
+    async def priced(skin_name: str, price: Optional[float]):
+        nonlocal done
+        done += 1
+        if price is not None:
+            found[skin_name] = price
+            result.from_steam += 1
+            pending_checkpoint.append((skin_name, price))
+            await flush_checkpoint()
+        await report(skin_name)
+
+    async def worker():
+        while True:
+            try:
+                names = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            if len(names) > 1:
+                # One search page, never a market sweep: /check must keep reporting progress
+                bulk = await prices.get_prices_bulk(names, PRIORITY_CHECK, max_pages=1)
+                for skin_name in [name for name in names if name in bulk]:
+                    await priced(skin_name, bulk[skin_name])
+                names = [name for name in names if name not in bulk]
+
+            for skin_name in names:
+                price = None
+                for _ in range(STEAM_PRICE_RETRIES):
+                    _, price = await prices.get_price(skin_name, PRIORITY_CHECK)
+                    # No point retrying while the circuit is open: it would fail fast again
+                    if price is not None or not prices.client.available():
+                        break
+                await priced(skin_name, price)
+
+    await report(None, force=True)
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(VALUATION_WORKERS, queue.qsize()))))
+    finally:
+        await flush_checkpoint(force=True)
+
+    for skin_name, count in inventory.items():
+        price = found.get(skin_name)
+        if price:
+            result.priced.append((skin_name, price, count, price * count))
+        else:
+            result.failed.append(skin_name)
+
+    result.priced.sort(key=lambda x: x[3], reverse=True)
+    return result
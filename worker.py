@@ -0,0 +1,40 @@
+import asyncio
+from aiogram import Bot
+
+from config import BOT_TOKEN, WORKER_ID, METRICS_HOST, WORKER_METRICS_PORT
+from database import db
+from steam_client import SteamClient
+from price_cache import PriceCache
+from monitor import run_worker
+from metrics import start_metrics_server
+from fx import run_fx_refresher
+from catalog import catalog
+
+async def main():
+    await db.connect()
+    await db.create_tables()
+    # Names seen by the monitor are learned into the shared catalog
+    await catalog.load()
+
+    bot = Bot(token=BOT_TOKEN)
+    steam = SteamClient()
+    await steam.start()
+    metrics_runner = await start_metrics_server(METRICS_HOST, WORKER_METRICS_PORT) if WORKER_METRICS_PORT else None
+    # Alert messages are rendered in each user's currency
+    fx_task = asyncio.create_task(run_fx_refresher())
+
+    try:
+        await run_worker(bot, PriceCache(steam), WORKER_ID)
+    finally:
+        fx_task.cancel()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await steam.close()
+        await bot.session.close()
+        await db.close()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Worker stopped manually")